@@ -31,21 +31,43 @@ from history_manager import HistoryManager
 from bookmarks_manager import BookmarksManager
 from settings_dialog import SettingsDialog
 from crawler_worker import CrawlerWorker
+from crawl_jobs import CrawlJobManager, STATE_LABELS, QUEUED, CANCELLED
 from ai_module import AIChatDialog, AISummaryDialog  # 新增AI模块
-from utils import SELENIUM_AVAILABLE, DOCX_AVAILABLE
+from utils import SELENIUM_AVAILABLE, DOCX_AVAILABLE, PYARROW_AVAILABLE
 # 添加 PluginManager 的导入
 from plugin_manager import PluginManager
 # 添加更新管理器导入
 from update_manager import UpdateManager
 
 class ModernBrowser(QMainWindow):
+    # 所有窗口共用一个爬虫引擎，避免多个实例同时写同一批存储文件和数据库
+    _shared_crawler = None
+    _crawler_users = 0
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("道衍AI浏览器 - 智能合规爬虫版")
         self.resize(1400, 900)
         
         # 初始化组件
-        self.crawler = CrawlerWorker()
+        if ModernBrowser._shared_crawler is None:
+            ModernBrowser._shared_crawler = CrawlerWorker()
+        ModernBrowser._crawler_users += 1
+        self.crawler = ModernBrowser._shared_crawler
+        # 抓取在后台线程池中执行，结果通过信号逐页返回
+        self.crawl_jobs = CrawlJobManager(self.crawler, parent=self)
+        self.crawl_jobs.job_added.connect(self.on_crawl_job_added)
+        self.crawl_jobs.job_state_changed.connect(self.on_crawl_job_state)
+        self.crawl_jobs.job_progress.connect(self.on_crawl_job_progress)
+        self.crawl_jobs.page_done.connect(self.on_crawl_page_done)
+        self.crawl_jobs.job_finished.connect(self.on_crawl_job_finished)
+        self.crawl_jobs.robots_denied.connect(self.on_robots_denied)
+        self.crawl_job_items = {}  # job_id -> {item, description, state, done, total}
+        # 新数据合并后定时刷新列表，避免每个页面都重绘界面
+        self.data_refresh_timer = QTimer(self)
+        self.data_refresh_timer.setSingleShot(True)
+        self.data_refresh_timer.setInterval(200)
+        self.data_refresh_timer.timeout.connect(self.append_new_data_items)
         self.download_manager = DownloadManager(self)
         self.history_manager = HistoryManager(self)
         self.bookmarks_manager = BookmarksManager(self)
@@ -304,6 +326,16 @@ class ModernBrowser(QMainWindow):
         translate_action.setShortcut("Ctrl+Shift+T")
         translate_action.triggered.connect(self.translate_page)
         
+        crawl_tab_action = QAction("抓取当前标签页", self)
+        crawl_tab_action.triggered.connect(self.start_crawl)
+
+        crawl_all_tabs_action = QAction("抓取所有标签页", self)
+        crawl_all_tabs_action.setShortcut("Ctrl+Shift+A")
+        crawl_all_tabs_action.triggered.connect(self.crawl_all_tabs)
+
+        crawl_site_action = QAction("后台抓取当前站点", self)
+        crawl_site_action.triggered.connect(self.crawl_current_site)
+        
         # 新增AI相关菜单项
         ai_menu = menubar.addMenu("AI 功能")
         ai_chat_action = QAction("AI 聊天", self)
@@ -328,6 +360,9 @@ class ModernBrowser(QMainWindow):
         tools_menu.addAction(downloads_action)
         tools_menu.addAction(history_action)
         tools_menu.addAction(translate_action)
+        tools_menu.addAction(crawl_tab_action)
+        tools_menu.addAction(crawl_all_tabs_action)
+        tools_menu.addAction(crawl_site_action)
         tools_menu.addSeparator()
         tools_menu.addAction(settings_action)
 
@@ -529,23 +564,125 @@ class ModernBrowser(QMainWindow):
         browser = self.tab_widget.currentWidget()
         if not isinstance(browser, QWebEngineView): return
 
-        current_url = browser.url().toString()
+        # robots.txt 在后台任务中检查，不允许时通过 robots_denied 信号回到界面询问
+        self.status_label.setText("🔍 正在抓取页面...")
+        self.crawl_tab(browser, lambda url, html: self.crawl_jobs.submit_html([(url, html)], confirm_robots=True))
 
-        if not self.crawler.can_fetch(current_url):
-            reply = QMessageBox.question(
-                self, "风险提示",
-                f"⚠️ robots.txt 不允许爬取该网站。\n是否继续？",
-                QMessageBox.Yes | QMessageBox.No
-            )
-            if reply == QMessageBox.No: return
+    def on_robots_denied(self, url, html):
+        reply = QMessageBox.question(
+            self, "风险提示",
+            f"⚠️ robots.txt 不允许爬取该网站。\n{url}\n是否继续？",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.crawl_jobs.submit_html([(url, html)])
 
-        self.status_label.setText("🔍 正在抓取页面...")
-        QTimer.singleShot(100, lambda: self._do_crawl_in_thread(current_url))
+    def crawl_tab(self, browser, callback):
+        """读取标签页中已渲染的 DOM，不重新下载页面
+
+        读取完成后调用 callback(url, html)，解析在后台任务中进行。
+        """
+        url = browser.url().toString()
+        browser.page().runJavaScript(
+            "document.documentElement.outerHTML",
+            lambda html: callback(url, html)
+        )
+
+    def crawl_all_tabs(self):
+        """抓取所有打开的标签页（使用已渲染的 DOM），robots.txt 不允许的页面跳过"""
+        tabs = []
+        for i in range(self.tab_widget.count()):
+            browser = self.tab_widget.widget(i)
+            if isinstance(browser, QWebEngineView) and self.crawler.is_valid_url(browser.url().toString()):
+                tabs.append(browser)
+        if not tabs:
+            self.status_label.setText("没有可抓取的标签页")
+            return
+
+        pages = []
+
+        def on_html(url, html):
+            pages.append((url, html))
+            # 所有标签页的 DOM 都读取完后作为一个任务提交，robots.txt 在后台检查
+            if len(pages) == len(tabs):
+                self.crawl_jobs.submit_html(pages, respect_robots=True)
+
+        self.status_label.setText(f"🔍 正在读取 {len(tabs)} 个标签页...")
+        for browser in tabs:
+            self.crawl_tab(browser, on_html)
+
+    def crawl_current_site(self):
+        """在后台抓取当前标签页所在站点"""
+        browser = self.tab_widget.currentWidget()
+        if not isinstance(browser, QWebEngineView):
+            return
+        url = browser.url().toString()
+        if not self.crawler.is_valid_url(url):
+            self.status_label.setText("❌ 无效的URL")
+            return
+        self.crawl_jobs.submit_site(url, max_depth=2, max_pages=100)
+
+    def on_crawl_job_added(self, job_id, description):
+        item = QListWidgetItem()
+        item.setData(Qt.UserRole, job_id)
+        self.crawl_job_items[job_id] = {
+            "item": item, "description": description, "state": QUEUED,
+            "done": 0, "total": self.crawl_jobs.jobs[job_id].total,
+        }
+        self.job_list.addItem(item)
+        self._refresh_job_item(job_id)
+        self.status_label.setText(f"🔍 已加入抓取任务: {description}")
+
+    def _refresh_job_item(self, job_id):
+        entry = self.crawl_job_items.get(job_id)
+        if entry is None:
+            return
+        progress = f"{entry['done']}/{entry['total']}" if entry["total"] else f"{entry['done']}"
+        entry["item"].setText(f"#{job_id} {entry['description']} — {STATE_LABELS[entry['state']]} {progress}")
+
+    def on_crawl_job_state(self, job_id, state):
+        if job_id in self.crawl_job_items:
+            self.crawl_job_items[job_id]["state"] = state
+            self._refresh_job_item(job_id)
+
+    def on_crawl_job_progress(self, job_id, done, total):
+        if job_id in self.crawl_job_items:
+            self.crawl_job_items[job_id]["done"] = done
+            self._refresh_job_item(job_id)
 
-    def _do_crawl_in_thread(self, url):
-        success, msg = self.crawler.crawl_single_page(url)
+    def on_crawl_page_done(self, job_id, url, success, msg):
         self.status_label.setText(f"{'✅' if success else '❌'} {msg}")
-        self.update_data_list()
+        if success and not self.data_refresh_timer.isActive():
+            self.data_refresh_timer.start()
+
+    def on_crawl_job_finished(self, job_id, stats):
+        entry = self.crawl_job_items.pop(job_id, None)
+        if entry is not None:
+            if "error" in stats:
+                entry["item"].setText(f"#{job_id} {entry['description']} — 出错: {stats['error']}")
+            elif stats.get("cancelled"):
+                entry["item"].setText(f"#{job_id} {entry['description']} — {STATE_LABELS[CANCELLED]} {entry['done']}")
+            self.status_label.setText(f"抓取任务 #{job_id} 已结束，共处理 {entry['done']} 个页面")
+        self.append_new_data_items()
+
+    def _selected_job_id(self):
+        item = self.job_list.currentItem()
+        return item.data(Qt.UserRole) if item is not None else None
+
+    def pause_selected_job(self):
+        job_id = self._selected_job_id()
+        if job_id is not None:
+            self.crawl_jobs.pause(job_id)
+
+    def resume_selected_job(self):
+        job_id = self._selected_job_id()
+        if job_id is not None:
+            self.crawl_jobs.resume(job_id)
+
+    def cancel_selected_job(self):
+        job_id = self._selected_job_id()
+        if job_id is not None:
+            self.crawl_jobs.cancel(job_id)
 
     def create_data_panel(self):
         panel = QWidget()
@@ -577,22 +714,43 @@ class ModernBrowser(QMainWindow):
         export_txt = QPushButton("📤 导出训练集")
         export_docx = QPushButton("📄 导出DOCX")
         export_docx.setEnabled(DOCX_AVAILABLE)
+        export_parquet = QPushButton("📊 导出Parquet")
+        export_parquet.setEnabled(PYARROW_AVAILABLE)
 
         save_btn.clicked.connect(self.save_all_data)
         clear_btn.clicked.connect(self.clear_all_data)
         export_txt.clicked.connect(self.export_training_data)
         export_docx.clicked.connect(self.export_as_docx)
+        export_parquet.clicked.connect(self.export_as_parquet)
 
         btn_layout.addWidget(save_btn)
         btn_layout.addWidget(clear_btn)
         btn_layout.addWidget(export_txt)
         btn_layout.addWidget(export_docx)
+        btn_layout.addWidget(export_parquet)
 
         data_layout.addWidget(QLabel("已抓取页面"))
         data_layout.addWidget(self.data_list)
         data_layout.addWidget(QLabel("内容预览"))
         data_layout.addWidget(self.data_preview)
         data_layout.addLayout(btn_layout)
+
+        # 抓取任务
+        self.job_list = QListWidget()
+        self.job_list.setMaximumHeight(120)
+        job_btn_layout = QHBoxLayout()
+        pause_job_btn = QPushButton("⏸️ 暂停")
+        resume_job_btn = QPushButton("▶️ 继续")
+        cancel_job_btn = QPushButton("⏹️ 取消")
+        pause_job_btn.clicked.connect(self.pause_selected_job)
+        resume_job_btn.clicked.connect(self.resume_selected_job)
+        cancel_job_btn.clicked.connect(self.cancel_selected_job)
+        job_btn_layout.addWidget(pause_job_btn)
+        job_btn_layout.addWidget(resume_job_btn)
+        job_btn_layout.addWidget(cancel_job_btn)
+        data_layout.addWidget(QLabel("抓取任务"))
+        data_layout.addWidget(self.job_list)
+        data_layout.addLayout(job_btn_layout)
         
         # 教程面板
         tutorial_widget = QWidget()
@@ -627,7 +785,13 @@ class ModernBrowser(QMainWindow):
 
     def update_data_list(self):
         self.data_list.clear()
-        for i, d in enumerate(self.crawler.crawled_data):
+        self.append_new_data_items()
+
+    def append_new_data_items(self):
+        """只添加列表中还没有的记录"""
+        records = self.crawler.crawled_data
+        for i in range(self.data_list.count(), len(records)):
+            d = records[i]
             item = QListWidgetItem(f"{i+1}. {d['title']} ({d['word_count']}字)")
             item.setData(Qt.UserRole, i)
             self.data_list.addItem(item)
@@ -647,31 +811,25 @@ class ModernBrowser(QMainWindow):
 
     def save_all_data(self):
         path = os.path.join(self.crawler.output_dir, "crawled_data.json")
-        try:
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(self.crawler.crawled_data, f, ensure_ascii=False, indent=2)
+        success, msg = self.crawler.export_json(path)
+        if success:
             QMessageBox.information(self, "成功", f"数据已保存到：\n{path}")
-        except Exception as e:
-            QMessageBox.critical(self, "失败", str(e))
+        else:
+            QMessageBox.critical(self, "失败", msg)
 
     def clear_all_data(self):
         if QMessageBox.question(self, "确认", "清空所有爬取数据？") == QMessageBox.Yes:
-            self.crawler.crawled_data.clear()
+            self.crawler.clear_data()
             self.data_list.clear()
             self.data_preview.clear()
 
     def export_training_data(self):
         path = os.path.join(self.crawler.output_dir, "training_data.txt")
-        try:
-            with open(path, 'w', encoding='utf-8') as f:
-                for d in self.crawler.crawled_data:
-                    f.write(f"URL: {d['url']}\n")
-                    f.write(f"标题: {d['title']}\n")
-                    f.write(f"内容:\n{d['full_content']}\n")
-                    f.write("\n" + "="*80 + "\n\n")
+        success, msg = self.crawler.export_training_txt(path)
+        if success:
             QMessageBox.information(self, "成功", f"训练数据已生成：\n{path}")
-        except Exception as e:
-            QMessageBox.critical(self, "失败", str(e))
+        else:
+            QMessageBox.critical(self, "失败", msg)
 
     def export_as_docx(self):
         path, _ = QFileDialog.getSaveFileName(self, "保存DOCX", "", "Word文件 (*.docx)")
@@ -679,6 +837,15 @@ class ModernBrowser(QMainWindow):
         success, msg = self.crawler.export_to_docx(path)
         QMessageBox.information(self, "结果", msg)
 
+    def export_as_parquet(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "保存Parquet", os.path.join(self.crawler.output_dir, "crawled_data.parquet"),
+            "Parquet文件 (*.parquet)"
+        )
+        if not path: return
+        success, msg = self.crawler.export_parquet(path)
+        QMessageBox.information(self, "结果", msg)
+
     def update_navigation_buttons(self):
         browser = self.tab_widget.currentWidget()
         if isinstance(browser, QWebEngineView):
@@ -898,6 +1065,11 @@ class ModernBrowser(QMainWindow):
     def closeEvent(self, event):
         """窗口关闭事件，保存会话"""
         self.save_session()
+        self.crawl_jobs.shutdown()
+        ModernBrowser._crawler_users -= 1
+        if ModernBrowser._crawler_users == 0:
+            self.crawler.close()
+            ModernBrowser._shared_crawler = None
         event.accept()
 
     def show_tutorial(self, item):
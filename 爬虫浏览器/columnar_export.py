@@ -0,0 +1,108 @@
+from utils import PYARROW_AVAILABLE
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    RECORD_SCHEMA = pa.schema([
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("timestamp", pa.string()),
+        ("content_preview", pa.string()),
+        ("full_content", pa.string()),
+        ("word_count", pa.int64()),
+        ("char_count", pa.int64()),
+        ("total_links", pa.int64()),
+        ("internal_links", pa.int64()),
+        ("external_links", pa.int64()),
+        ("top_links", pa.list_(pa.string())),
+        ("images", pa.list_(pa.string())),
+        ("meta_description", pa.string()),
+        ("canonical_url", pa.string()),
+        ("near_duplicate_of", pa.string()),
+        ("near_duplicate_similarity", pa.float64()),
+    ])
+
+# 统计时只读取这些列，不会触及 full_content
+STAT_COLUMNS = ["url", "word_count", "char_count", "total_links", "internal_links",
+                "external_links", "near_duplicate_of"]
+
+
+def _batches(records, batch_size):
+    columns = {name: [] for name in RECORD_SCHEMA.names}
+    count = 0
+    for record in records:
+        for name, values in columns.items():
+            values.append(record.get(name))
+        count += 1
+        if count == batch_size:
+            yield pa.record_batch([columns[n] for n in RECORD_SCHEMA.names], schema=RECORD_SCHEMA)
+            columns = {name: [] for name in RECORD_SCHEMA.names}
+            count = 0
+    if count:
+        yield pa.record_batch([columns[n] for n in RECORD_SCHEMA.names], schema=RECORD_SCHEMA)
+
+
+def export_parquet(records, path, row_group_size=10000, compression="zstd"):
+    """流式导出为 Parquet，每 row_group_size 条记录写一个行组，内存占用与总记录数无关
+
+    返回写出的记录数。
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Parquet 导出需要安装 pyarrow")
+    count = 0
+    with pq.ParquetWriter(path, RECORD_SCHEMA, compression=compression) as writer:
+        for batch in _batches(records, row_group_size):
+            writer.write_batch(batch, row_group_size=row_group_size)
+            count += batch.num_rows
+    return count
+
+
+def export_arrow(records, path, batch_size=10000):
+    """流式导出为未压缩的 Arrow IPC 文件，可通过 open_arrow 内存映射零拷贝读取
+
+    返回写出的记录数。
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Arrow 导出需要安装 pyarrow")
+    count = 0
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, RECORD_SCHEMA) as writer:
+            for batch in _batches(records, batch_size):
+                writer.write_batch(batch)
+                count += batch.num_rows
+    return count
+
+
+def open_arrow(path):
+    """内存映射打开 Arrow IPC 文件，返回 pyarrow.Table，数据按需从页缓存读取"""
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def open_parquet(path, columns=None):
+    """内存映射读取 Parquet 文件，可只读取部分列"""
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def corpus_stats(path):
+    """计算语料统计，只读取数值和 URL 列，不反序列化正文"""
+    if path.endswith(".parquet"):
+        table = open_parquet(path, columns=STAT_COLUMNS)
+    else:
+        table = open_arrow(path).select(STAT_COLUMNS)
+    rows = table.num_rows
+    stats = {
+        "records": rows,
+        "unique_urls": pc.count_distinct(table["url"]).as_py() if rows else 0,
+        "near_duplicates": rows - table["near_duplicate_of"].null_count if rows else 0,
+    }
+    if not rows:
+        return stats
+    for name in ("word_count", "char_count", "total_links", "internal_links", "external_links"):
+        column = table[name]
+        stats[f"{name}_sum"] = pc.sum(column).as_py() or 0
+        stats[f"{name}_mean"] = pc.mean(column).as_py()
+    quantiles = pc.quantile(table["char_count"], q=[0.5, 0.9, 0.99])
+    stats["char_count_p50"], stats["char_count_p90"], stats["char_count_p99"] = quantiles.to_pylist()
+    return stats
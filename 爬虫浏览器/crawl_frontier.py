@@ -0,0 +1,142 @@
+import time
+import sqlite3
+import threading
+
+PENDING = 0
+IN_FLIGHT = 1
+DONE = 2
+FAILED = 3
+
+class CrawlFrontier:
+    """基于 SQLite (WAL) 的持久化抓取队列
+
+    每个URL只出现一次，状态为 pending / in_flight / done / failed，
+    按 priority 从高到低、同优先级按入队顺序出队。
+    队列数据全部在磁盘上，内存占用与队列长度无关；
+    进程崩溃后重新打开时，in_flight 的URL会退回 pending，done 的URL不会重抓。
+    path 为 ":memory:" 时仅在内存中使用，不做持久化。
+    key 为URL的判重键（如规范化后的URL），用于按外部得分表批量调整优先级。
+    """
+
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                state INTEGER NOT NULL DEFAULT 0,
+                priority REAL NOT NULL DEFAULT 0,
+                depth INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL DEFAULT 0,
+                key TEXT
+            )
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(frontier)")]
+        if "key" not in columns:
+            # 旧版本创建的队列文件
+            self.conn.execute("ALTER TABLE frontier ADD COLUMN key TEXT")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_frontier_queue ON frontier(state, priority DESC)"
+        )
+        self.recover()
+
+    def recover(self):
+        """把上次未完成的 in_flight URL 放回待抓取队列，返回数量"""
+        with self._lock:
+            cur = self.conn.execute(
+                "UPDATE frontier SET state=? WHERE state=?", (PENDING, IN_FLIGHT)
+            )
+            return cur.rowcount
+
+    def add(self, url, depth=0, priority=0.0, key=None):
+        """入队，URL已存在（任意状态）时忽略并返回 False"""
+        with self._lock:
+            cur = self.conn.execute(
+                "INSERT OR IGNORE INTO frontier (url, state, priority, depth, updated_at, key) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, PENDING, priority, depth, time.time(), key),
+            )
+            return cur.rowcount > 0
+
+    def add_many(self, items):
+        """批量入队，items 为 (url, depth, priority, key) 序列，返回新入队数量"""
+        now = time.time()
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO frontier (url, state, priority, depth, updated_at, key) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    ((url, PENDING, priority, depth, now, key) for url, depth, priority, key in items),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return self.conn.total_changes - before
+
+    def claim(self, n=1):
+        """取出最多 n 个待抓取URL并标记为 in_flight，返回 [(url, depth), ...]"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT url, depth FROM frontier WHERE state=? ORDER BY priority DESC, rowid LIMIT ?",
+                    (PENDING, n),
+                ).fetchall()
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE frontier SET state=?, attempts=attempts+1, updated_at=? WHERE url=?",
+                    ((IN_FLIGHT, now, url) for url, _ in rows),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return rows
+
+    def mark_done(self, url):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE frontier SET state=?, updated_at=? WHERE url=?", (DONE, time.time(), url)
+            )
+
+    def mark_failed(self, url, retry=True):
+        """标记失败；retry 为 True 且未超过 max_attempts 时重新排队"""
+        with self._lock:
+            row = self.conn.execute("SELECT attempts FROM frontier WHERE url=?", (url,)).fetchone()
+            if row is None:
+                return
+            state = PENDING if retry and row[0] < self.max_attempts else FAILED
+            self.conn.execute(
+                "UPDATE frontier SET state=?, updated_at=? WHERE url=?", (state, time.time(), url)
+            )
+
+    def apply_scores(self, db_path, table):
+        """用另一个 SQLite 数据库中的得分表 table(url, score) 更新待抓取URL的优先级，返回待抓取URL数量
+
+        按 key 匹配 table.url；整个更新是一条 UPDATE 语句，不把队列读入内存。
+        没有得分的URL保持原优先级。
+        """
+        with self._lock:
+            self.conn.execute("ATTACH DATABASE ? AS ext", (db_path,))
+            try:
+                cur = self.conn.execute(
+                    f"UPDATE frontier SET priority=COALESCE("
+                    f"(SELECT score FROM ext.{table} WHERE url=frontier.key), priority) "
+                    "WHERE state=? AND key IS NOT NULL",
+                    (PENDING,),
+                )
+                return cur.rowcount
+            finally:
+                self.conn.execute("DETACH DATABASE ext")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,174 @@
+import logging
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from job_control import JobControl
+
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+FINISHED = "finished"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+STATE_LABELS = {
+    QUEUED: "排队中", RUNNING: "运行中", PAUSED: "已暂停",
+    FINISHED: "已完成", CANCELLED: "已取消", FAILED: "出错",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlJob(QRunnable):
+    """在线程池中执行的一个抓取任务
+
+    work(control, report) 在工作线程中运行，每完成一个页面调用 report(url, success, msg)，
+    返回值（统计信息字典）随 job_finished 信号发出。
+    """
+
+    def __init__(self, job_id, description, total, work, manager):
+        super().__init__()
+        # 由管理器持有引用，避免 Qt 在任务结束后删除仍被 Python 引用的对象
+        self.setAutoDelete(False)
+        self.job_id = job_id
+        self.description = description
+        self.total = total  # 0 表示总数未知（如站点抓取）
+        self.done = 0
+        self.state = QUEUED
+        self.control = JobControl()
+        self._work = work
+        self._manager = manager
+
+    def _set_state(self, state):
+        self.state = state
+        self._manager.job_state_changed.emit(self.job_id, state)
+
+    def report(self, url, success, msg):
+        self.done += 1
+        self._manager.page_done.emit(self.job_id, url, success, msg)
+        self._manager.job_progress.emit(self.job_id, self.done, self.total)
+
+    def run(self):
+        if self.control.cancelled:
+            self._set_state(CANCELLED)
+            self._manager.job_finished.emit(self.job_id, {})
+            return
+        self._set_state(PAUSED if self.control.paused else RUNNING)
+        try:
+            result = self._work(self.control, self.report) or {}
+        except Exception as e:
+            logger.exception(f"抓取任务 {self.job_id} 出错")
+            self._set_state(FAILED)
+            self._manager.job_finished.emit(self.job_id, {"error": str(e)})
+            return
+        self._set_state(CANCELLED if self.control.cancelled else FINISHED)
+        self._manager.job_finished.emit(self.job_id, result)
+
+
+class CrawlJobManager(QObject):
+    """抓取任务队列
+
+    任务在 QThreadPool 中执行，界面线程不做任何网络请求或解析；
+    最多同时运行 max_concurrent_jobs 个任务，其余排队。
+    结果通过信号逐页发回，信号连接的槽在界面线程中执行。
+    """
+
+    job_added = pyqtSignal(int, str)                # job_id, 描述
+    job_state_changed = pyqtSignal(int, str)        # job_id, 状态
+    job_progress = pyqtSignal(int, int, int)        # job_id, 已完成页数, 总页数（0 为未知）
+    page_done = pyqtSignal(int, str, bool, str)     # job_id, url, 是否成功, 消息
+    job_finished = pyqtSignal(int, dict)            # job_id, 统计信息
+    robots_denied = pyqtSignal(str, str)            # url, html（等待用户确认是否继续）
+
+    def __init__(self, crawler, max_concurrent_jobs=2, parent=None):
+        super().__init__(parent)
+        self.crawler = crawler
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_concurrent_jobs)
+        self.jobs = {}
+        self._next_id = 1
+        self.job_finished.connect(self._forget)
+
+    def _submit(self, description, total, work):
+        job = CrawlJob(self._next_id, description, total, work, self)
+        self._next_id += 1
+        self.jobs[job.job_id] = job
+        self.job_added.emit(job.job_id, description)
+        self.pool.start(job)
+        return job.job_id
+
+    def _forget(self, job_id, _stats):
+        self.jobs.pop(job_id, None)
+
+    def submit_page(self, url, render_profile=None):
+        """下载并抓取单个页面"""
+        def work(control, report):
+            if control.checkpoint():
+                report(url, *self.crawler.crawl_single_page(url, render_profile))
+        return self._submit(f"页面 {url}", 1, work)
+
+    def submit_html(self, pages, respect_robots=False, confirm_robots=False):
+        """抓取已经拿到的页面 HTML，pages 为 [(url, html), ...]
+
+        respect_robots 为 True 时在后台检查 robots.txt，不允许的页面跳过；
+        confirm_robots 为 True 时不允许的页面改为发出 robots_denied 信号，由界面询问用户是否继续。
+        """
+        def work(control, report):
+            for url, html in pages:
+                if not control.checkpoint():
+                    break
+                if (respect_robots or confirm_robots) and not self.crawler.can_fetch(url):
+                    if confirm_robots and html:
+                        self.robots_denied.emit(url, html)
+                        report(url, False, "robots.txt 不允许，等待确认")
+                    else:
+                        report(url, False, "robots.txt 不允许")
+                elif not html:
+                    report(url, False, "无法读取页面内容")
+                else:
+                    report(url, *self.crawler.crawl_html(url, html))
+        description = f"标签页 {pages[0][0]}" if len(pages) == 1 else f"{len(pages)} 个标签页"
+        return self._submit(description, len(pages), work)
+
+    def submit_many(self, urls, **kwargs):
+        """并发抓取URL列表，其余参数传给 CrawlerWorker.crawl_many"""
+        urls = list(urls)
+
+        def work(control, report):
+            return self.crawler.crawl_many(urls, callback=report, control=control, **kwargs)
+        return self._submit(f"{len(urls)} 个URL", len(urls), work)
+
+    def submit_site(self, seed, **kwargs):
+        """站点抓取，其余参数传给 CrawlerWorker.crawl_site"""
+        def work(control, report):
+            for data in self.crawler.crawl_site(seed, control=control, **kwargs):
+                report(data["url"], True, data["title"])
+        return self._submit(f"站点 {seed}", kwargs.get("max_pages", 100), work)
+
+    def pause(self, job_id):
+        job = self.jobs.get(job_id)
+        if job and job.state in (QUEUED, RUNNING):
+            job.control.pause()
+            if job.state == RUNNING:
+                job._set_state(PAUSED)
+
+    def resume(self, job_id):
+        job = self.jobs.get(job_id)
+        if job and job.control.paused:
+            job.control.resume()
+            if job.state == PAUSED:
+                job._set_state(RUNNING)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.control.cancel()
+        # 尚未开始的任务直接从队列中移除
+        if self.pool.tryTake(job):
+            job._set_state(CANCELLED)
+            self.job_finished.emit(job_id, {})
+
+    def shutdown(self, timeout_ms=10000):
+        """取消全部任务并等待进行中的页面完成"""
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+        return self.pool.waitForDone(timeout_ms)
@@ -0,0 +1,586 @@
+import os
+import re
+import gzip
+import json
+import time
+import hashlib
+import threading
+import logging
+from utils import ZSTD_AVAILABLE
+
+if ZSTD_AVAILABLE:
+    import zstandard
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+
+class _FileLock:
+    """跨进程的排他文件锁，锁在单独的 .lock 文件上
+
+    POSIX 使用 fcntl.flock，Windows 使用 msvcrt.locking；进程退出时锁自动释放。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+
+    def acquire(self, blocking=True):
+        """获取锁；blocking 为 False 且锁被其他进程持有时返回 False"""
+        while True:
+            try:
+                if os.name == "nt":
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(0.01)
+
+    def release(self):
+        if os.name == "nt":
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def close(self):
+        self._file.close()
+
+
+class CompactRecord:
+    """只在内存中保留元数据的抓取记录
+
+    full_content、content_preview、链接和图片列表等大字段不常驻内存，
+    访问时按定位信息从存储中读取。支持 record['title'] / record.get(...) 的字典式访问，
+    可直接替代 extract_page_data 返回的字典放入 crawled_data。
+    """
+
+    __slots__ = ("url", "title", "timestamp", "word_count", "char_count", "total_links",
+                 "internal_links", "external_links", "near_duplicate_of", "_store", "_locator")
+
+    FIELDS = __slots__[:-2]
+
+    def __init__(self, record, store, locator):
+        for name in self.FIELDS:
+            setattr(self, name, record.get(name))
+        self._store = store
+        self._locator = locator
+
+    def load(self):
+        """从存储读取完整记录"""
+        return self._store.read(self._locator)
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        record = self.load()
+        return record[key]
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.load().get(key, default)
+
+    def __contains__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key) is not None
+        return key in self.load()
+
+    def keys(self):
+        return self.load().keys()
+
+    def to_dict(self):
+        return self.load()
+
+    def __repr__(self):
+        return f"CompactRecord(url={self.url!r}, title={self.title!r})"
+
+
+class JsonlCrawlStore:
+    """只追加的 JSONL 抓取记录存储
+
+    每条记录序列化一次、追加写入一行，写入代价与已有记录数量无关。
+    每 fsync_every 条记录或每 fsync_interval 秒执行一次 fsync；
+    打开文件时若末尾存在未写完的半行（进程崩溃导致），会被截掉。
+    多个进程可以同时追加同一个文件：写入在 path.lock 的文件锁内进行，
+    记录偏移取写入后的文件大小，而不是本进程的文件位置。
+    """
+
+    def __init__(self, path, fsync_every=64, fsync_interval=5.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file_lock = _FileLock(path + ".lock")
+        with self._file_lock:
+            self._recover_tail()
+            self._file = open(path, 'ab')
+
+    def _recover_tail(self):
+        """截掉文件末尾不完整的记录"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r+b') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            pos = size
+            block = 64 * 1024
+            while pos > 0:
+                step = min(block, pos)
+                pos -= step
+                f.seek(pos)
+                chunk = f.read(step)
+                idx = chunk.rfind(b'\n')
+                if idx != -1:
+                    end = pos + idx + 1
+                    break
+            else:
+                end = 0
+            if end < size:
+                logger.warning(f"{self.path} 末尾存在不完整记录（{size - end} 字节），已截断")
+                f.truncate(end)
+
+    def append(self, record):
+        """追加一条记录，返回 (偏移, 长度)，可用于 read_at 随机读取"""
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock, self._file_lock:
+            self._file.write(line)
+            self._file.flush()
+            # 以追加方式打开，写入总在文件末尾；其他进程也在写时 tell() 并不是这条记录的位置
+            offset = os.fstat(self._file.fileno()).st_size - len(line)
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+        return offset, len(line)
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """把缓冲区写入磁盘"""
+        with self._lock:
+            if self._file and self._unsynced:
+                self._file.flush()
+                self._sync()
+
+    def read(self, locator):
+        """按 append 返回的定位信息读取单条记录"""
+        return self.read_at(*locator)
+
+    def read_at(self, offset, length=None):
+        """按偏移读取单条记录"""
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            line = f.read(length) if length else f.readline()
+        return json.loads(line)
+
+    def __iter__(self):
+        """逐行读取全部记录，不会一次性载入内存"""
+        with self._lock:
+            if self._file:
+                self._file.flush()
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def clear(self):
+        """清空全部记录"""
+        with self._lock, self._file_lock:
+            self._file.truncate(0)
+            self._file.seek(0)
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.flush()
+                self._sync()
+                self._file.close()
+                self._file = None
+                self._file_lock.close()
+
+
+class ShardedCrawlStore:
+    """分片压缩的抓取记录存储
+
+    记录按顺序写入 part-00000.jsonl.gz（安装 zstandard 时为 .jsonl.zst）等分片，
+    单个分片达到 max_records 条或 max_bytes 字节（未压缩）时关闭并开始下一个。
+    分片内部由若干独立压缩帧（gzip member / zstd frame）拼接而成，
+    每帧约 frame_bytes 字节原文，因此读取单条记录只需解压一帧。
+
+    分片关闭时写出同名的 .manifest.json，包含记录数、各帧的字节范围、
+    每条记录在帧内的位置以及内容哈希，下游可据此并行处理或随机读取。
+    写入中的分片另有 .idx 索引文件，进程崩溃后重新打开时据此截掉不完整的帧并补写清单。
+    多个进程可以共用同一目录：每个实例独占地创建自己的分片，写入期间持有分片的 .lock 文件锁，
+    恢复时跳过其他进程正在写入的分片。
+    """
+
+    _PART_RE = re.compile(r"^part-(\d{5})\.jsonl\.(gz|zst)$")
+    _LOCK_RE = re.compile(r"^part-(\d{5})\.lock$")
+
+    def __init__(self, directory, max_records=100_000, max_bytes=256 * 1024 * 1024,
+                 frame_bytes=256 * 1024, compression="auto", level=None):
+        if compression == "auto":
+            compression = "zst" if ZSTD_AVAILABLE else "gz"
+        if compression == "zst" and not ZSTD_AVAILABLE:
+            raise ValueError("zstd 压缩需要安装 zstandard")
+        self.directory = directory
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.frame_bytes = frame_bytes
+        self.compression = compression
+        self.level = level
+        self._lock = threading.Lock()
+        self._frame_cache = None  # (shard, frame_index, bytes)
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._open_next_shard()
+
+    # ---- 压缩 ----
+
+    def _compress(self, data):
+        if self.compression == "zst":
+            return zstandard.ZstdCompressor(level=self.level or 3).compress(data)
+        return gzip.compress(data, compresslevel=self.level or 6, mtime=0)
+
+    @staticmethod
+    def _decompress(data, compression):
+        if compression == "zst":
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    # ---- 路径 ----
+
+    def shard_name(self, index, compression=None):
+        return f"part-{index:05d}.jsonl.{compression or self.compression}"
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def _manifest_path(shard_path):
+        return re.sub(r"\.jsonl\.(gz|zst)$", ".manifest.json", shard_path)
+
+    @staticmethod
+    def _index_path(shard_path):
+        return shard_path + ".idx"
+
+    def _lock_path(self, index):
+        return self._path(f"part-{index:05d}.lock")
+
+    def shards(self):
+        """按顺序返回已有分片文件名"""
+        names = []
+        for name in os.listdir(self.directory):
+            m = self._PART_RE.match(name)
+            if m:
+                names.append((int(m.group(1)), name))
+        return [name for _, name in sorted(names)]
+
+    def load_manifest(self, name):
+        with open(self._manifest_path(self._path(name)), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    # ---- 写入 ----
+
+    def _open_next_shard(self):
+        existing = self.shards()
+        index = int(self._PART_RE.match(existing[-1]).group(1)) + 1 if existing else 0
+        while True:
+            # 先锁住序号再独占创建分片，其他进程选到同一序号时顺延到下一个
+            lock = _FileLock(self._lock_path(index))
+            if lock.acquire(blocking=False):
+                try:
+                    self._file = open(self._path(self.shard_name(index)), 'xb')
+                    break
+                except FileExistsError:
+                    lock.release()
+            lock.close()
+            index += 1
+        self._shard_lock = lock
+        self._shard = self.shard_name(index)
+        self._index = open(self._index_path(self._path(self._shard)), 'w', encoding='utf-8')
+        self._frames = []
+        self._entries = []
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._records = 0
+        self._raw_bytes = 0
+
+    def _flush_frame(self):
+        if not self._buffer:
+            return
+        raw = b''.join(line for line, _ in self._buffer)
+        frame = self._compress(raw)
+        offset = self._file.tell()
+        self._file.write(frame)
+        self._file.flush()
+        frame_index = len(self._frames)
+        first = len(self._entries)
+        pos = 0
+        for line, digest in self._buffer:
+            self._entries.append([frame_index, pos, len(line), digest])
+            pos += len(line)
+        info = {"offset": offset, "length": len(frame), "first_record": first,
+                "records": len(self._buffer), "raw_bytes": len(raw)}
+        self._frames.append(info)
+        self._index.write(json.dumps(
+            {"frame": info, "entries": self._entries[first:]}, ensure_ascii=False
+        ) + '\n')
+        self._index.flush()
+        self._buffer = []
+        self._buffer_bytes = 0
+
+    def _close_shard(self, sync=True):
+        self._flush_frame()
+        if sync:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._index.close()
+        path = self._path(self._shard)
+        if self._records:
+            self._write_manifest(path, self._frames, self._entries)
+        else:
+            os.remove(path)
+        os.remove(self._index_path(path))
+        self._release_shard_lock()
+
+    def _release_shard_lock(self):
+        lock, self._shard_lock = self._shard_lock, None
+        lock.release()
+        lock.close()
+        try:
+            os.remove(lock.path)
+        except OSError:
+            pass
+
+    def _write_manifest(self, path, frames, entries):
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        manifest = {
+            "shard": os.path.basename(path),
+            "compression": "zst" if path.endswith(".zst") else "gz",
+            "records": len(entries),
+            "raw_bytes": sum(fr["raw_bytes"] for fr in frames),
+            "compressed_bytes": os.path.getsize(path),
+            "sha256": sha256.hexdigest(),
+            "frames": frames,
+            # [帧序号, 帧内偏移, 长度, 记录内容 blake2b 哈希]
+            "entries": entries,
+        }
+        tmp = self._manifest_path(path) + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp, self._manifest_path(path))
+
+    def append(self, record):
+        """追加一条记录，返回 (分片名, 记录序号)，可用于 read 随机读取"""
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        digest = hashlib.blake2b(line, digest_size=16).hexdigest()
+        with self._lock:
+            if self._records and (self._records >= self.max_records
+                                  or self._raw_bytes + len(line) > self.max_bytes):
+                self._close_shard()
+                self._open_next_shard()
+            self._buffer.append((line, digest))
+            self._buffer_bytes += len(line)
+            self._records += 1
+            self._raw_bytes += len(line)
+            locator = (self._shard, self._records - 1)
+            if self._buffer_bytes >= self.frame_bytes:
+                self._flush_frame()
+        return locator
+
+    def sync(self):
+        """把缓冲中的记录压缩成帧写入磁盘"""
+        with self._lock:
+            if self._file and self._buffer:
+                self._flush_frame()
+                os.fsync(self._file.fileno())
+                os.fsync(self._index.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._close_shard()
+                self._file = None
+
+    def clear(self):
+        """删除全部分片"""
+        with self._lock:
+            self._file.close()
+            self._index.close()
+            self._release_shard_lock()
+            for name in os.listdir(self.directory):
+                if name.startswith("part-") and not self._LOCK_RE.match(name):
+                    os.remove(self._path(name))
+            self._frame_cache = None
+            self._open_next_shard()
+
+    # ---- 崩溃恢复 ----
+
+    def _recover(self):
+        for name in self.shards():
+            path = self._path(name)
+            if os.path.exists(self._manifest_path(path)):
+                continue
+            lock = _FileLock(self._lock_path(int(self._PART_RE.match(name).group(1))))
+            if not lock.acquire(blocking=False):
+                # 其他进程正在写入
+                lock.close()
+                continue
+            try:
+                self._recover_shard(name, path)
+            finally:
+                lock.release()
+                lock.close()
+                try:
+                    os.remove(lock.path)
+                except OSError:
+                    pass
+
+    def _recover_shard(self, name, path):
+        """截掉未正常关闭的分片中不完整的帧，并按 .idx 补写清单"""
+        frames, entries = [], []
+        index_path = self._index_path(path)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        break  # 末尾半行
+                    frames.append(item["frame"])
+                    entries.extend(item["entries"])
+        # 索引中记录了但未完整落盘的帧一并丢弃
+        size = os.path.getsize(path)
+        while frames and frames[-1]["offset"] + frames[-1]["length"] > size:
+            del entries[frames.pop()["first_record"]:]
+        end = frames[-1]["offset"] + frames[-1]["length"] if frames else 0
+        with open(path, 'r+b') as f:
+            f.truncate(end)
+        if frames:
+            self._write_manifest(path, frames, entries)
+            logger.warning(f"分片 {name} 未正常关闭，已恢复 {len(entries)} 条记录")
+        else:
+            os.remove(path)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+    # ---- 读取 ----
+
+    def _read_frame(self, name, frame, compression):
+        with open(self._path(name), 'rb') as f:
+            f.seek(frame["offset"])
+            return self._decompress(f.read(frame["length"]), compression)
+
+    def read(self, locator):
+        """按 append 返回的 (分片名, 记录序号) 读取单条记录，只解压所在的一帧"""
+        name, number = locator
+        with self._lock:
+            if name == self._shard:
+                # 当前分片：记录可能还在缓冲区
+                if number >= len(self._entries):
+                    line, _ = self._buffer[number - len(self._entries)]
+                    return json.loads(line)
+                frames, entries = self._frames, self._entries
+            else:
+                frames = entries = None
+        if frames is None:
+            manifest = self.load_manifest(name)
+            frames, entries = manifest["frames"], manifest["entries"]
+        frame_index, pos, length, _ = entries[number]
+        cache = self._frame_cache
+        if cache and cache[0] == name and cache[1] == frame_index:
+            raw = cache[2]
+        else:
+            compression = "zst" if name.endswith(".zst") else "gz"
+            raw = self._read_frame(name, frames[frame_index], compression)
+            self._frame_cache = (name, frame_index, raw)
+        return json.loads(raw[pos:pos + length])
+
+    def iter_shard(self, name):
+        """逐条读取一个已关闭的分片，可由多个进程分别处理不同分片"""
+        compression = "zst" if name.endswith(".zst") else "gz"
+        manifest = self.load_manifest(name)
+        for frame in manifest["frames"]:
+            raw = self._read_frame(name, frame, compression)
+            for line in raw.splitlines():
+                if line:
+                    yield json.loads(line)
+
+    def __iter__(self):
+        """按写入顺序读取全部记录（包括当前分片已写入的部分）"""
+        with self._lock:
+            current = self._shard
+            self._flush_frame()
+            frames = list(self._frames)
+        for name in self.shards():
+            if name == current:
+                compression = "zst" if name.endswith(".zst") else "gz"
+                for frame in frames:
+                    raw = self._read_frame(name, frame, compression)
+                    for line in raw.splitlines():
+                        if line:
+                            yield json.loads(line)
+            else:
+                yield from self.iter_shard(name)
+
+
+def export_json(records, path):
+    """流式导出为 JSON 数组（格式与原 crawled_data.json 相同），返回记录数"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for record in records:
+            body = json.dumps(record, ensure_ascii=False, indent=2)
+            f.write(',\n  ' if count else '\n  ')
+            f.write(body.replace('\n', '\n  '))
+            count += 1
+        f.write('\n]' if count else ']')
+    return count
+
+
+def export_training_txt(records, path):
+    """流式导出为训练数据 TXT，跳过被标记为近似重复的页面，返回写出的记录数"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in records:
+            if item.get('near_duplicate_of'):
+                continue
+            f.write(f"URL: {item['url']}\n")
+            f.write(f"标题: {item['title']}\n")
+            f.write(f"字数: {item['word_count']} 字\n")
+            f.write(f"内容:\n{item['full_content']}\n")
+            f.write("\n" + "=" * 80 + "\n\n")
+            count += 1
+    return count
@@ -1,21 +1,36 @@
 import os
-import json
 import re
+import time
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from urllib.parse import urlparse, urljoin
-import requests
-from bs4 import BeautifulSoup
-from utils import SELENIUM_AVAILABLE, DOCX_AVAILABLE
+from urllib.parse import urlparse, urldefrag
+from requests import HTTPError
+from http_client import CrawlerHttpClient, ConnectionPrewarmer, RejectedResponse, NotModified
+from dns_cache import DnsCache
+from html_parsers import parse_html, resolve_backend
+from page_extractor import extract_parts
+from robots_cache import RobotsCache
+from crawl_frontier import CrawlFrontier
+from link_graph import LinkGraph
+from url_utils import canonicalize_url, ScalableBloomFilter
+from near_dup import NearDuplicateIndex
+from crawl_store import JsonlCrawlStore, ShardedCrawlStore, CompactRecord, export_json, export_training_txt
+from columnar_export import export_parquet
+from validator_cache import ValidatorCache
+from recrawl_scheduler import RecrawlScheduler
+from render_detector import RenderDetector, visible_text_length
+from driver_pool import DriverPool, resolve_profile
+from politeness import PolitenessScheduler, HostQueue, HostThrottled, THROTTLE_STATUS, parse_retry_after
+from retry_policy import Retrier, CircuitBreaker, CircuitOpen, classify_error
+from utils import SELENIUM_AVAILABLE, DOCX_AVAILABLE, PYARROW_AVAILABLE
 
 if SELENIUM_AVAILABLE:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
     from selenium.webdriver.common.by import By
-    from webdriver_manager.chrome import ChromeDriverManager
-    from selenium.webdriver.chrome.service import Service
 
 if DOCX_AVAILABLE:
     from docx import Document
@@ -25,13 +40,74 @@ if DOCX_AVAILABLE:
 class CrawlerWorker:
     """增强版爬虫引擎，支持动态渲染和静态解析"""
     
-    def __init__(self, output_dir="crawled_data"):
+    def __init__(self, output_dir="crawled_data", pool_connections=64, pool_maxsize=8,
+                 near_dup_threshold=0.85, near_dup_action="flag", output_format="jsonl", shard_options=None,
+                 parser="auto", max_page_bytes=5 * 1024 * 1024, conditional_requests=True,
+                 recrawl_budget_per_hour=600, selenium_pool_size=2, selenium_max_pages=100,
+                 render_profile="text", host_rate=2.0, host_burst=2, max_host_wait=60.0,
+                 retry_policies=None, breaker_threshold=5, breaker_cooldown=60.0,
+                 dns_cache=True, prewarm_hosts=8, link_scoring=True, rescore_every=50):
         self.output_dir = output_dir
+        # 单个页面最多读取的字节数，超出的部分不交给解析器
+        self.max_page_bytes = max_page_bytes
+        # HTML 解析后端："auto"、"lxml"、"html.parser"、"html5lib"
+        self.parser = resolve_backend(parser)
         self.crawled_data = []
-        self.driver = None
+        # near_dup_action: "flag" 标记近似重复页面（不写入训练集），"drop" 直接丢弃，None 关闭去重
+        self.near_dup_action = near_dup_action
+        self.near_dup = None
+        # 进程内 DNS 缓存；批量抓取时为队列前面的 prewarm_hosts 个主机提前建立连接，0 为关闭
+        self.dns_cache = DnsCache() if dns_cache else None
+        self.http = CrawlerHttpClient(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                      dns_cache=self.dns_cache)
+        self.prewarm_hosts = prewarm_hosts
+        self.prewarmer = ConnectionPrewarmer(self.http) if prewarm_hosts else None
+        self.robots = RobotsCache(self.http)
+        # 每个主机的令牌桶：每秒 host_rate 个请求，遵守 Crawl-delay，429/503 时退避；
+        # 单个请求最多为限流等待 max_host_wait 秒，超过则放弃该页面
+        self.politeness = PolitenessScheduler(rate=host_rate, burst=host_burst, delay_fn=self.crawl_delay)
+        self.max_host_wait = max_host_wait
+        # 连接失败、读超时、5xx、DNS 错误按类别重试；主机连续失败后熔断
+        self.retrier = Retrier(
+            policies=retry_policies,
+            breaker=CircuitBreaker(failure_threshold=breaker_threshold, cooldown=breaker_cooldown),
+            neutral=(HostThrottled,),
+            logger=logging.getLogger(__name__),
+        )
+        # Selenium driver 池在第一次需要动态渲染时才创建
+        self.selenium_pool_size = selenium_pool_size
+        self.selenium_max_pages = selenium_max_pages
+        # 动态渲染时屏蔽的资源："text" 屏蔽图片/媒体/字体/CSS/统计脚本，"full" 全部加载，
+        # 也可以传入 RenderProfile；各抓取方法的 render_profile 参数可为单个任务覆盖
+        self.render_profile = resolve_profile(render_profile)
+        self.driver_pool = None
+        self._selenium_failed = False
+        # 按域名记录静态抓取得到的是否只是 JS 空壳，是则改用浏览器渲染
+        self.render_detector = RenderDetector()
+        self._data_lock = threading.Lock()
+        self._driver_lock = threading.Lock()
         self.setup_logging()
-        if SELENIUM_AVAILABLE:
-            self.setup_selenium()
+        # output_format: "jsonl" 写入单个 crawled_data.jsonl；"shards" 写入 shards/ 下的压缩分片
+        if output_format == "shards":
+            self.store = ShardedCrawlStore(os.path.join(self.output_dir, "shards"), **(shard_options or {}))
+        else:
+            self.store = JsonlCrawlStore(os.path.join(self.output_dir, "crawled_data.jsonl"))
+        # 重新抓取时发送 If-None-Match / If-Modified-Since，未变化的页面跳过解析
+        self.conditional_requests = conditional_requests
+        self.validators = ValidatorCache(os.path.join(self.output_dir, "validators.db"))
+        # 记录每个URL的正文哈希和变化频率，安排重新抓取
+        self.recrawl = RecrawlScheduler(
+            os.path.join(self.output_dir, "recrawl.db"), budget_per_hour=recrawl_budget_per_hour
+        )
+        # 记录已抓取页面的出链，站点抓取时按链接图得分（PageRank，无 NumPy 时为入链数）优先抓取重要页面；
+        # 新页面数达到 rescore_every 且不少于已打分节点数的 10% 时重新计算一次得分
+        self.link_graph = LinkGraph(
+            os.path.join(self.output_dir, "link_graph.db"), rescore_every=rescore_every
+        ) if link_scoring else None
+        if near_dup_action:
+            self.near_dup = NearDuplicateIndex(
+                os.path.join(self.output_dir, "near_dup.db"), threshold=near_dup_threshold
+            )
 
     def setup_logging(self):
         os.makedirs(self.output_dir, exist_ok=True)
@@ -46,23 +122,25 @@ class CrawlerWorker:
         self.logger = logging.getLogger(__name__)
 
     def setup_selenium(self):
-        try:
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument(
-                "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            )
+        """返回 Selenium driver 池，第一次调用时创建；不可用时返回 None
 
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.logger.info("Selenium 初始化成功")
-        except Exception as e:
-            self.logger.warning(f"Selenium 初始化失败: {e}")
-            self.driver = None
+        创建池时启动第一个 driver 以确认环境可用，失败后本实例不再尝试。
+        """
+        if not SELENIUM_AVAILABLE or self._selenium_failed:
+            return None
+        with self._driver_lock:
+            if self.driver_pool is None and not self._selenium_failed:
+                pool = DriverPool(size=self.selenium_pool_size, max_pages=self.selenium_max_pages,
+                                  logger=self.logger, profile=self.render_profile)
+                try:
+                    pool.release(pool.acquire())
+                    self.driver_pool = pool
+                    self.logger.info("Selenium 初始化成功")
+                except Exception as e:
+                    self.logger.warning(f"Selenium 初始化失败: {e}")
+                    pool.close()
+                    self._selenium_failed = True
+            return self.driver_pool
 
     def is_valid_url(self, url):
         try:
@@ -73,18 +151,18 @@ class CrawlerWorker:
 
     def can_fetch(self, url, user_agent="*"):
         try:
-            parsed = urlparse(url)
-            base_url = f"{parsed.scheme}://{parsed.netloc}"
-            robots_url = f"{base_url}/robots.txt"
-
-            rp = urllib.robotparser.RobotFileParser()
-            rp.set_url(robots_url)
-            rp.read()
-            return rp.can_fetch(user_agent, url)
+            return self.robots.can_fetch(url, user_agent)
         except Exception as e:
             self.logger.warning(f"无法检查 robots.txt: {e}")
             return True  # 宽松策略
 
+    def crawl_delay(self, url, user_agent="*"):
+        """robots.txt 要求的最小请求间隔（秒），综合 Crawl-delay 与 Request-rate"""
+        try:
+            return self.robots.min_interval(url, user_agent)
+        except Exception:
+            return 0.0
+
     def clean_text(self, text):
         if not text:
             return ""
@@ -93,28 +171,19 @@ class CrawlerWorker:
         return text.strip()
 
     def extract_page_data(self, soup, current_url):
-        # 移除无关标签
-        for tag in soup(["script", "style", "nav", "footer", "header"]):
-            tag.decompose()
+        return self._extract(soup, current_url)[0]
 
-        title = soup.find('title')
-        title_text = title.get_text().strip() if title else "无标题"
+    def _extract(self, soup, current_url):
+        """单次遍历提取页面数据，返回 (记录, 全部链接)"""
+        parts = extract_parts(soup, current_url)
+        title_text = parts.title.strip() if parts.title is not None else "无标题"
 
         # 提取正文
-        paragraphs = []
-        for p in soup.find_all(['p', 'h1', 'h2', 'h3', 'li']):
-            txt = p.get_text().strip()
-            if len(txt) > 20:
-                paragraphs.append(txt)
-
+        paragraphs = [txt for txt in (block.strip() for block in parts.blocks) if len(txt) > 20]
         full_text = '\n'.join(paragraphs)
         clean_text = self.clean_text(full_text)
 
-        links = [urljoin(current_url, a.get('href')) for a in soup.find_all('a', href=True)]
-        internal_links = [link for link in links if urlparse(link).netloc == urlparse(current_url).netloc]
-        external_links = [link for link in links if link not in internal_links]
-
-        return {
+        record = {
             "title": title_text,
             "url": current_url,
             "timestamp": datetime.now().isoformat(),
@@ -122,81 +191,552 @@ class CrawlerWorker:
             "full_content": clean_text,
             "word_count": len(clean_text.split()),
             "char_count": len(clean_text),
-            "total_links": len(links),
-            "internal_links": len(internal_links),
-            "external_links": len(external_links),
-            "top_links": links[:50],
-            "images": [img.get('src') for img in soup.find_all('img', src=True)][:20],
-            "meta_description": "",
+            "total_links": len(parts.links),
+            "internal_links": parts.internal_links,
+            "external_links": parts.external_links,
+            "top_links": parts.links[:50],
+            "images": parts.images[:20],
+            "meta_description": parts.meta_description,
+            "canonical_url": parts.canonical_url,
+            "opengraph": parts.opengraph,
+            "json_ld": parts.json_ld,
+        }
+        return record, parts.all_links
+
+    def download_html(self, url, conditional=False):
+        """流式下载页面，返回 (正文, 验证信息)
+
+        非网页或过大的响应抛出 RejectedResponse。
+        conditional 为 True 时带上次保存的 ETag / Last-Modified 发送条件请求，
+        服务器返回 304 或正文哈希与上次相同时抛出 NotModified。
+        请求前按主机限速，主机退避时间过长时抛出 HostThrottled。
+        网络错误按 self.retrier 的策略重试，主机熔断时抛出 CircuitOpen。
+        """
+        headers, cached = self.validators.conditional_headers(url) if conditional else ({}, None)
+        response, body = self.retrier.call(url, lambda: self._request_page(url, headers))
+        if response.status_code == 304:
+            raise NotModified(url)
+        content_hash = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if cached and cached["content_hash"] == content_hash:
+            raise NotModified(url)
+        if self.max_page_bytes and len(body) >= self.max_page_bytes:
+            self.logger.info(f"页面超过 {self.max_page_bytes} 字节，只解析前面部分: {url}")
+        validator = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": content_hash,
         }
+        return body, validator
+
+    def _request_page(self, url, headers):
+        """按主机限速后发出一次请求，并把响应状态反馈给限速器"""
+        self.politeness.learn_delay(url)
+        self.politeness.wait(url, max_wait=self.max_host_wait)
+        try:
+            response, body = self.http.fetch_html(url, max_bytes=self.max_page_bytes, headers=headers)
+        except HTTPError as e:
+            if e.response is not None:
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                self.politeness.feedback(url, e.response.status_code, retry_after)
+            raise
+        self.politeness.feedback(url, response.status_code)
+        return response, body
 
     def crawl_with_requests(self, url):
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            if response.encoding != 'utf-8':
-                response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.content, 'html.parser')
+            body, _ = self.download_html(url)
+            soup = parse_html(body, self.parser)
             return soup, True
         except Exception as e:
             self.logger.warning(f"Requests 失败: {e}")
             return None, False
 
-    def crawl_with_selenium(self, url):
-        if not self.driver:
+    def crawl_with_selenium(self, url, render_profile=None):
+        pool = self.setup_selenium()
+        if pool is None:
             return None, False
         try:
-            self.driver.get(url)
-            WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
+            # 每个 driver 同一时间只被一个线程使用，多个页面可在不同 driver 中并行渲染
+            with pool.driver(profile=render_profile) as driver:
+                driver.get(url)
+                WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+                page_source = driver.page_source
+            soup = parse_html(page_source, self.parser)
             return soup, True
         except Exception as e:
             self.logger.warning(f"Selenium 失败: {e}")
             return None, False
 
-    def crawl_single_page(self, url):
+    def fetch_soup(self, url, conditional=False, render_profile=None):
+        """获取页面并解析为 BeautifulSoup，返回 (soup, 验证信息)，失败时 soup 为 None
+
+        conditional 为 True 且页面未变化时抛出 NotModified。
+        主机限流、熔断或网络错误等稍后可能恢复的失败抛出原异常，由调用方决定是否重新排队。
+        """
+        try:
+            body, validator = self.download_html(url, conditional=conditional)
+            soup = parse_html(body, self.parser)
+            if SELENIUM_AVAILABLE:
+                soup = self._render_if_needed(url, soup, len(body), render_profile)
+            return soup, validator
+        except (RejectedResponse, NotModified) as e:
+            if isinstance(e, NotModified):
+                raise
+            # 不是网页，用浏览器渲染也没有意义
+            self.logger.info(f"跳过 {url}: {e}")
+            return None, None
+        except (HostThrottled, CircuitOpen) as e:
+            self.logger.info(f"跳过 {url}: {e}")
+            raise
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code in THROTTLE_STATUS:
+                # 服务器要求降速，换用浏览器只会加重负担
+                self.logger.warning(f"被限流 {url}: {e.response.status_code}")
+                raise
+            self.logger.warning(f"Requests 失败: {e}")
+            if classify_error(e) is not None:
+                raise
+            if e.response is not None and 400 <= e.response.status_code < 500:
+                # 404/403/410 等：浏览器只会渲染出错误页
+                return None, None
+        except Exception as e:
+            self.logger.warning(f"Requests 失败: {e}")
+            # 重试后仍然连不上的主机，浏览器同样打不开
+            if classify_error(e) is not None:
+                raise
+
+        if SELENIUM_AVAILABLE:
+            soup, success = self.crawl_with_selenium(url, render_profile)
+            if success:
+                return soup, None
+        return None, None
+
+    def _render_if_needed(self, url, soup, markup_size, render_profile=None):
+        """静态页面像 JS 空壳时改用浏览器渲染，返回应当使用的 soup
+
+        域名尚无结论时渲染一次并比较可见文本，结论按域名缓存。
+        """
+        known = self.render_detector.verdict(url)
+        if known is False or not self.render_detector.should_render(url, soup, markup_size):
+            return soup
+        rendered, success = self.crawl_with_selenium(url, render_profile)
+        if not success:
+            return soup
+        if known is None:
+            static_chars = visible_text_length(soup)
+            rendered_chars = visible_text_length(rendered)
+            host = urlparse(url).netloc
+            if not self.render_detector.record_render(url, static_chars, rendered_chars):
+                self.logger.info(f"{host} 不需要动态渲染 (静态 {static_chars} / 渲染后 {rendered_chars} 字符)")
+                return soup
+            self.logger.info(f"{host} 需要动态渲染 (静态 {static_chars} / 渲染后 {rendered_chars} 字符)")
+        return rendered
+
+    def _crawl_one(self, url, render_profile=None):
+        """抓取一个页面，返回 (状态, 记录, 出链, 去重签名)，状态为 "ok" / "unchanged" / "retry" / "failed"
+
+        页面未变化时不解析，出链取自上次抓取时保存的结果。
+        去重签名在抓取线程中计算，写入时交给 _accept_record，关闭去重或没有记录时为 None。
+        "retry" 表示限流、熔断或网络错误等暂时性失败，"failed" 表示 404、非网页等重抓也不会成功的失败。
+        """
+        try:
+            soup, validator = self.fetch_soup(
+                url, conditional=self.conditional_requests, render_profile=render_profile
+            )
+        except NotModified:
+            self.validators.touch(url)
+            self.recrawl.observe(url)
+            return "unchanged", None, self.validators.links(url), None
+        except Exception:
+            return "retry", None, [], None
+        if soup is None:
+            return "failed", None, [], None
+        data, links = self._extract(soup, url)
+        signature = None
+        if self.near_dup is not None:
+            # MinHash 签名在抓取线程中计算，调度线程只做分桶查找和写入
+            signature = self.near_dup.signature(data["full_content"])
+        if validator:
+            self.validators.put(url, links=links, **validator)
+        self.recrawl.observe(url, data["full_content"])
+        if self.link_graph is not None:
+            self.link_graph.add_page(canonicalize_url(url), [canonicalize_url(link) for link in links])
+        return "ok", data, links, signature
+
+    def _fetch_page(self, url, render_profile=None):
+        """fetch_page 的内部版本，返回 (状态, 记录, 消息, 去重签名)，状态同 _crawl_one"""
+        if not self.is_valid_url(url):
+            return "failed", None, "无效的URL", None
+
+        status, data, _, signature = self._crawl_one(url, render_profile)
+        if status == "unchanged":
+            data = {"url": url, "timestamp": datetime.now().isoformat(), "unchanged": True}
+            return status, data, "页面未变化，跳过解析", None
+        if status in ("failed", "retry"):
+            return status, None, "页面获取失败", None
+        return status, data, f"成功抓取 {len(data['full_content'])} 字符", signature
+
+    def fetch_page(self, url, render_profile=None):
+        """抓取并解析单个页面，不写入 crawled_data，可在工作线程中调用
+
+        页面自上次抓取后未变化时返回 {"url", "timestamp", "unchanged": True}。
+        """
+        _, data, msg, _ = self._fetch_page(url, render_profile)
+        return data, msg
+
+    def check_near_duplicate(self, data, signature=None):
+        """检查页面是否与已收录页面近似重复，按 near_dup_action 处理
+
+        signature 为抓取线程中事先算好的 MinHash 签名，None 时在此计算。
+        返回 False 表示该页面应被丢弃。
+        """
+        if self.near_dup is None:
+            return True
+        try:
+            dup_url, similarity = self.near_dup.check_and_add(data["url"], data["full_content"], signature)
+        except Exception as e:
+            self.logger.warning(f"近似重复检测失败: {e}")
+            return True
+        if dup_url is None:
+            return True
+        self.logger.info(f"近似重复页面: {data['url']} ≈ {dup_url} (相似度 {similarity:.2f})")
+        if self.near_dup_action == "drop":
+            return False
+        data["near_duplicate_of"] = dup_url
+        data["near_duplicate_similarity"] = round(similarity, 4)
+        return True
+
+    def _accept_record(self, data, signature=None):
+        """去重后写入存储，并以只含元数据的 CompactRecord 加入 crawled_data，返回是否保留"""
+        if not self.check_near_duplicate(data, signature):
+            return False
+        with self._data_lock:
+            try:
+                locator = self.store.append(data)
+            except Exception as e:
+                self.logger.error(f"保存失败: {e}")
+                self.crawled_data.append(data)
+            else:
+                self.crawled_data.append(CompactRecord(data, self.store, locator))
+        return True
+
+    def crawl_single_page(self, url, render_profile=None):
+        _, data, msg, signature = self._fetch_page(url, render_profile)
+        if data is None:
+            return False, msg
+        if data.get("unchanged"):
+            return True, msg
+        return self._store_single(data, msg, signature)
+
+    def crawl_html(self, url, html):
+        """解析已经拿到的 HTML 并保存，不发起网络请求
+
+        用于浏览器标签页中已渲染的 DOM：登录后可见或由 JavaScript 生成的内容都能保留。
+        """
         if not self.is_valid_url(url):
             return False, "无效的URL"
+        try:
+            data, _ = self._extract(parse_html(html, self.parser), url)
+        except Exception as e:
+            self.logger.warning(f"解析失败 {url}: {e}")
+            return False, f"解析失败: {e}"
+        self.recrawl.observe(url, data["full_content"])
+        return self._store_single(data, f"成功抓取 {len(data['full_content'])} 字符")
+
+    def _store_single(self, data, msg, signature=None):
+        if not self._accept_record(data, signature):
+            return False, "与已抓取页面近似重复，已丢弃"
+        with self._data_lock:
+            self.save_data()
+        if "near_duplicate_of" in data:
+            msg += f"（与 {data['near_duplicate_of']} 近似重复）"
+        return True, msg
+
+    def crawl_many(self, urls, max_workers=16, per_host_limit=4, callback=None, render_profile=None,
+                   control=None, max_attempts=3):
+        """并发抓取多个URL
+
+        max_workers 为全局并发上限，per_host_limit 为单个主机的并发上限；
+        各主机的请求频率由 self.politeness 控制，派发时优先选择最早可请求的主机。
+        被限流、熔断或网络错误等暂时性失败的URL重新放回队列，在主机退避结束后再派发，
+        每个URL最多尝试 max_attempts 次。
+        每完成一个页面调用一次 callback(url, success, msg)。
+        render_profile 为本次任务动态渲染时使用的资源屏蔽配置，None 时使用实例的默认配置。
+        control 为 JobControl 时可暂停、继续或取消，取消后不再派发新的URL。
+        返回统计信息字典，其中 pages_per_sec 为整体吞吐量，cancelled 表示是否被取消。
+        """
+        queue = HostQueue(self.politeness, per_host_limit)
+        seen = set()
+        invalid = []
+        for url in urls:
+            if url in seen:
+                continue
+            seen.add(url)
+            if not self.is_valid_url(url):
+                invalid.append(url)
+                continue
+            queue.add(url)
+
+        if per_host_limit > self.http.pool_maxsize:
+            self.http.resize_pools(pool_maxsize=per_host_limit)
+
+        stats = {"total": len(seen), "success": 0, "failed": 0, "duplicates": 0, "unchanged": 0,
+                 "elapsed": 0.0, "pages_per_sec": 0.0, "cancelled": False}
+        for url in invalid:
+            stats["failed"] += 1
+            if callback:
+                callback(url, False, "无效的URL")
+
+        running = {}  # future -> url
+        attempts = {}
+        start = time.monotonic()
+
+        def dispatch(executor):
+            """派发所有已可请求的URL，返回距离下一个主机可请求还需等待的秒数"""
+            if queue and control is not None and not control.checkpoint():
+                stats["cancelled"] = True
+                queue.clear()
+                return None
+            delay = None
+            while len(running) < max_workers:
+                url, delay = queue.pop()
+                if url is None:
+                    break
+                running[executor.submit(self._fetch_page, url, render_profile)] = url
+            if self.prewarmer is not None:
+                for url in queue.upcoming(self.prewarm_hosts):
+                    self.prewarmer.warm(url)
+            return delay
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            delay = dispatch(executor)
+            while running or queue:
+                if not running:
+                    # 所有主机都在限速或退避中
+                    time.sleep(delay or 0.05)
+                    delay = dispatch(executor)
+                    continue
+                done, _ = wait(running, timeout=delay, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = running.pop(future)
+                    queue.done(url)
+                    try:
+                        status, data, msg, signature = future.result()
+                    except Exception as e:
+                        status, data, msg, signature = "failed", None, str(e), None
+                    if status == "retry" and not stats["cancelled"]:
+                        attempts[url] = attempts.get(url, 1) + 1
+                        if attempts[url] <= max_attempts:
+                            queue.add(url)
+                            continue
+                    if data is not None and data.get("unchanged"):
+                        stats["unchanged"] += 1
+                    elif data is not None:
+                        stats["success"] += 1
+                        if not self._accept_record(data, signature) or "near_duplicate_of" in data:
+                            stats["duplicates"] += 1
+                    else:
+                        stats["failed"] += 1
+                    if callback:
+                        callback(url, data is not None, msg)
+                delay = dispatch(executor)
+
+        with self._data_lock:
+            self.save_data()
+
+        stats["elapsed"] = time.monotonic() - start
+        if stats["elapsed"] > 0:
+            stats["pages_per_sec"] = (stats["success"] + stats["unchanged"]) / stats["elapsed"]
+        self.logger.info(
+            f"批量抓取完成: 成功 {stats['success']}, 未变化 {stats['unchanged']}, 失败 {stats['failed']}, "
+            f"近似重复 {stats['duplicates']}, "
+            f"耗时 {stats['elapsed']:.1f}s, {stats['pages_per_sec']:.2f} 页/秒"
+        )
+        return stats
+
+    def recrawl_due(self, limit=None, **kwargs):
+        """重新抓取到期的页面，数量受每小时抓取预算限制
 
-        success, msg = False, "未知错误"
-        soup, success = self.crawl_with_requests(url)
-        if not success and SELENIUM_AVAILABLE:
-            soup, success = self.crawl_with_selenium(url)
+        其余参数传给 crawl_many，返回其统计信息。
+        """
+        urls = self.recrawl.due(limit=limit)
+        if not urls:
+            return {"total": 0, "success": 0, "failed": 0, "duplicates": 0, "unchanged": 0,
+                    "elapsed": 0.0, "pages_per_sec": 0.0, "cancelled": False}
+        self.logger.info(f"重新抓取 {len(urls)} 个到期页面")
+        return self.crawl_many(urls, **kwargs)
 
-        if not success or not soup:
-            return False, "页面获取失败"
+    def crawl_site(self, seed, max_depth=2, max_pages=100, max_workers=4, respect_robots=True,
+                   frontier_path=None, render_profile=None, control=None):
+        """从 seed 出发抓取同站页面
 
-        data = self.extract_page_data(soup, url)
-        self.crawled_data.append(data)
-        self.save_data()
-        return True, f"成功抓取 {len(data['full_content'])} 字符"
+        开启链接图打分时优先抓取得分高的链接，否则按广度优先。
+
+        生成器：每抓取成功一个页面立即 yield 其数据，调用方可边抓边处理。
+        depth 为距离 seed 的链接跳数，seed 本身为 0。
+        指定 frontier_path 时抓取队列持久化到该 SQLite 文件，
+        进程中断后用同一路径再次调用即可从断点继续，已完成的页面不会重抓。
+        链接以规范化后的URL经布隆过滤器判重，已见过的链接不会再写入队列；
+        队列中保存并实际请求的是页面上的原始URL，规范化形式只用作判重键。
+        control 为 JobControl 时可暂停、继续或取消，取消后等进行中的页面完成即结束。
+        """
+        if not self.is_valid_url(seed):
+            self.logger.warning(f"无效的起始URL: {seed}")
+            return
+
+        site = urlparse(canonicalize_url(seed)).netloc
+        frontier = CrawlFrontier(frontier_path or ":memory:")
+        seen = ScalableBloomFilter(initial_capacity=100_000, path=f"{frontier_path}.seen" if frontier_path else None)
+        seen.add(canonicalize_url(seed))
+        frontier.add(seed, depth=0, key=canonicalize_url(seed))
+        scheduled = 0
+        crawled = 0
+        running = {}  # future -> (url, depth)
+        start = time.monotonic()
+
+        def fill(executor):
+            nonlocal scheduled
+            if control is not None and not control.checkpoint():
+                return
+            while len(running) < max_workers and scheduled < max_pages:
+                batch = frontier.claim(min(max_workers - len(running), max_pages - scheduled))
+                if not batch:
+                    break
+                for url, depth in batch:
+                    if respect_robots and not self.can_fetch(url):
+                        self.logger.info(f"robots.txt 禁止抓取，跳过: {url}")
+                        frontier.mark_failed(url, retry=False)
+                        continue
+                    scheduled += 1
+                    running[executor.submit(self._crawl_one, url, render_profile)] = (url, depth)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            fill(executor)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = running.pop(future)
+                    try:
+                        status, data, links, signature = future.result()
+                    except Exception as e:
+                        self.logger.warning(f"抓取失败 {url}: {e}")
+                        status, data, links, signature = "failed", None, [], None
+                    if status == "retry":
+                        # 暂时性失败重新排队（最多 max_attempts 次），不占用 max_pages 名额
+                        frontier.mark_failed(url)
+                        scheduled -= 1
+                        continue
+                    if status == "failed":
+                        # 404、非网页等重抓也不会成功
+                        frontier.mark_failed(url, retry=False)
+                        continue
+
+                    if depth < max_depth:
+                        new_links = []
+                        for link in links:
+                            key = canonicalize_url(link)
+                            if urlparse(key).netloc == site and seen.add(key):
+                                new_links.append((urldefrag(link)[0], key))
+                        scores = (self.link_graph.scores([key for _, key in new_links])
+                                  if self.link_graph is not None else {})
+                        frontier.add_many(
+                            (link, depth + 1, scores.get(key, 0.0), key) for link, key in new_links
+                        )
+                    frontier.mark_done(url)
+                    if self.link_graph is not None and self.link_graph.due():
+                        self._rescore_frontier(frontier)
+
+                    crawled += 1
+                    # 未变化的页面上次已保存，只沿原有出链继续
+                    if status == "ok" and self._accept_record(data, signature):
+                        yield data
+                fill(executor)
+        finally:
+            # 调用方提前停止迭代时取消尚未开始的任务
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=True)
+            frontier.close()
+            seen.close()
+            with self._data_lock:
+                self.save_data()
+            elapsed = time.monotonic() - start
+            rate = crawled / elapsed if elapsed > 0 else 0.0
+            self.logger.info(f"站点抓取结束: {seed}, 共 {crawled} 页, 耗时 {elapsed:.1f}s, {rate:.2f} 页/秒")
+
+    def _rescore_frontier(self, frontier):
+        """重新计算链接图得分并更新队列中待抓取URL的优先级"""
+        start = time.monotonic()
+        self.link_graph.compute()
+        pending = frontier.apply_scores(self.link_graph.path, LinkGraph.SCORE_VIEW)
+        self.logger.info(f"链接图重新打分: {len(self.link_graph)} 个节点, "
+                         f"{pending} 个待抓取URL, 耗时 {time.monotonic() - start:.2f}s")
+
+    def close(self):
+        if self.prewarmer is not None:
+            self.prewarmer.close()
+        self.http.close()
+        self.store.close()
+        self.validators.close()
+        self.recrawl.close()
+        if self.link_graph is not None:
+            self.link_graph.close()
+        if self.near_dup is not None:
+            self.near_dup.close()
+            self.near_dup = None
+        if self.driver_pool is not None:
+            self.driver_pool.close()
+            self.driver_pool = None
 
     def save_data(self):
+        """把已追加的记录同步到磁盘；记录在抓取时已逐条写入存储"""
         try:
-            # JSON 全量存储
-            with open(os.path.join(self.output_dir, 'crawled_data.json'), 'w', encoding='utf-8') as f:
-                json.dump(self.crawled_data, f, ensure_ascii=False, indent=2)
-
-            # TXT 训练数据格式
-            with open(os.path.join(self.output_dir, 'training_data.txt'), 'w', encoding='utf-8') as f:
-                for item in self.crawled_data:
-                    f.write(f"URL: {item['url']}\n")
-                    f.write(f"标题: {item['title']}\n")
-                    f.write(f"字数: {item['word_count']} 字\n")
-                    f.write(f"内容:\n{item['full_content']}\n")
-                    f.write("\n" + "=" * 80 + "\n\n")
+            self.store.sync()
         except Exception as e:
             self.logger.error(f"保存失败: {e}")
 
+    def export_json(self, filepath=None):
+        """从 JSONL 存储导出 crawled_data.json"""
+        filepath = filepath or os.path.join(self.output_dir, 'crawled_data.json')
+        try:
+            count = export_json(self.store, filepath)
+            return True, f"已导出 {count} 条记录至 {filepath}"
+        except Exception as e:
+            return False, str(e)
+
+    def export_training_txt(self, filepath=None):
+        """从 JSONL 存储导出训练数据 TXT（不含近似重复页面）"""
+        filepath = filepath or os.path.join(self.output_dir, 'training_data.txt')
+        try:
+            count = export_training_txt(self.store, filepath)
+            return True, f"已导出 {count} 条记录至 {filepath}"
+        except Exception as e:
+            return False, str(e)
+
+    def export_parquet(self, filepath=None, row_group_size=10000):
+        """从存储流式导出 Parquet 列式文件"""
+        if not PYARROW_AVAILABLE:
+            return False, "pyarrow 未安装"
+        filepath = filepath or os.path.join(self.output_dir, 'crawled_data.parquet')
+        try:
+            count = export_parquet(self.store, filepath, row_group_size=row_group_size)
+            return True, f"已导出 {count} 条记录至 {filepath}"
+        except Exception as e:
+            return False, str(e)
+
+    def clear_data(self):
+        """清空内存中的记录、磁盘上的存储、去重索引、验证信息缓存、重抓计划和链接图"""
+        with self._data_lock:
+            self.crawled_data.clear()
+            self.store.clear()
+            if self.near_dup is not None:
+                self.near_dup.clear()
+            self.validators.clear()
+            self.recrawl.clear()
+            if self.link_graph is not None:
+                self.link_graph.clear()
+
     def export_to_docx(self, filepath):
         if not DOCX_AVAILABLE:
             return False, "DOCX库未安装"
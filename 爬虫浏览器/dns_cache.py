@@ -0,0 +1,126 @@
+import time
+import socket
+import ipaddress
+import threading
+from collections import OrderedDict
+from utils import DNSPYTHON_AVAILABLE
+
+if DNSPYTHON_AVAILABLE:
+    import dns.resolver
+
+
+class DnsCache:
+    """进程内 DNS 缓存
+
+    安装了 dnspython 时按记录自身的 TTL 缓存（限制在 [min_ttl, max_ttl]），
+    否则使用系统解析器并按 default_ttl 缓存。解析失败按 negative_ttl 缓存，
+    避免对不存在的域名反复查询。同一主机的并发查询只发出一次。
+    LRU 淘汰，最多保留 max_entries 个主机。
+    """
+
+    def __init__(self, default_ttl=300, min_ttl=30, max_ttl=3600, negative_ttl=30,
+                 max_entries=10000, timeout=5.0):
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()  # host -> (地址列表或异常, 过期时间)
+        self._lock = threading.Lock()
+        self._resolve_locks = {}
+        if DNSPYTHON_AVAILABLE:
+            self._resolver = dns.resolver.Resolver()
+            self._resolver.lifetime = timeout
+
+    def _lookup(self, host):
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[host]
+                return None
+            self._entries.move_to_end(host)
+            return entry
+
+    def _store(self, host, value, ttl):
+        with self._lock:
+            self._entries[host] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _query_dnspython(self, host):
+        addresses = []
+        ttls = []
+        for rdtype in ("A", "AAAA"):
+            try:
+                answer = self._resolver.resolve(host, rdtype)
+            except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                continue
+            addresses.extend(record.address for record in answer)
+            ttls.append(answer.rrset.ttl)
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return addresses, min(ttls)
+
+    def _query_system(self, host):
+        infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        addresses = []
+        for family, _, _, _, sockaddr in infos:
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+        return addresses, self.default_ttl
+
+    def resolve(self, host):
+        """返回主机的 IP 地址列表；IP 地址原样返回；解析失败抛出 socket.gaierror"""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        host = host.lower()
+        entry = self._lookup(host)
+        if entry is None:
+            with self._lock:
+                lock = self._resolve_locks.setdefault(host, threading.Lock())
+            with lock:
+                entry = self._lookup(host)
+                if entry is None:
+                    try:
+                        if DNSPYTHON_AVAILABLE:
+                            addresses, ttl = self._query_dnspython(host)
+                        else:
+                            addresses, ttl = self._query_system(host)
+                        self._store(host, addresses, min(self.max_ttl, max(self.min_ttl, ttl)))
+                    except Exception as e:
+                        error = e if isinstance(e, socket.gaierror) else socket.gaierror(str(e))
+                        self._store(host, error, self.negative_ttl)
+                    entry = self._lookup(host)
+            with self._lock:
+                self._resolve_locks.pop(host, None)
+        value = entry[0] if entry else None
+        if isinstance(value, Exception):
+            raise value
+        return list(value or [])
+
+    def invalidate(self, host, address=None):
+        """删除缓存；指定 address 时只去掉这个连不上的地址"""
+        host = host.lower()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                return
+            if address is None or isinstance(entry[0], Exception):
+                del self._entries[host]
+                return
+            remaining = [a for a in entry[0] if a != address]
+            if remaining:
+                self._entries[host] = (remaining, entry[1])
+            else:
+                del self._entries[host]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,225 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from utils import SELENIUM_AVAILABLE
+
+if SELENIUM_AVAILABLE:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+IMAGE_PATTERNS = ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp")
+MEDIA_PATTERNS = ("*.mp4", "*.webm", "*.m3u8", "*.ts", "*.mp3", "*.ogg", "*.wav", "*.flv", "*.m4a")
+FONT_PATTERNS = ("*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot")
+CSS_PATTERNS = ("*.css",)
+TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "adservice.google.com", "facebook.net", "connect.facebook.net", "hm.baidu.com", "cnzz.com",
+    "umeng.com", "hotjar.com", "scorecardresearch.com", "adnxs.com", "criteo.com", "taboola.com",
+)
+
+
+class RenderProfile:
+    """Selenium 渲染时屏蔽的资源
+
+    通过 CDP 的 Network.setBlockedURLs 按URL模式屏蔽，借出 driver 时按需切换，
+    同一个 driver 可以在不同的抓取任务之间使用不同的配置。
+    按扩展名匹配，没有扩展名的图片等资源不会被屏蔽。
+    """
+
+    __slots__ = ("images", "media", "fonts", "css", "trackers", "extra_patterns")
+
+    def __init__(self, images=True, media=True, fonts=True, css=True, trackers=True, extra_patterns=()):
+        self.images = images
+        self.media = media
+        self.fonts = fonts
+        self.css = css
+        self.trackers = trackers
+        self.extra_patterns = tuple(extra_patterns)
+
+    def blocked_urls(self):
+        patterns = []
+        for enabled, group in ((self.images, IMAGE_PATTERNS), (self.media, MEDIA_PATTERNS),
+                               (self.fonts, FONT_PATTERNS), (self.css, CSS_PATTERNS)):
+            if enabled:
+                patterns.extend(group)
+                # 带查询参数的资源，如 a.png?v=1
+                patterns.extend(pattern + "?*" for pattern in group)
+        if self.trackers:
+            patterns.extend(f"*://*.{domain}/*" for domain in TRACKER_DOMAINS)
+            patterns.extend(f"*://{domain}/*" for domain in TRACKER_DOMAINS)
+        patterns.extend(self.extra_patterns)
+        return patterns
+
+
+# "text": 只需要 DOM 文本和链接；"full": 加载全部资源
+RENDER_PROFILES = {
+    "text": RenderProfile(),
+    "full": RenderProfile(images=False, media=False, fonts=False, css=False, trackers=False),
+}
+
+
+def resolve_profile(profile):
+    """接受 RenderProfile、预设名称或 None（不屏蔽），返回 RenderProfile"""
+    if profile is None:
+        return RENDER_PROFILES["full"]
+    if isinstance(profile, RenderProfile):
+        return profile
+    if profile not in RENDER_PROFILES:
+        raise ValueError(f"未知的渲染配置: {profile}，可选 {', '.join(RENDER_PROFILES)}")
+    return RENDER_PROFILES[profile]
+
+
+class DriverPool:
+    """有上限的 headless Chrome 池
+
+    driver 在第一次被借用时才创建，最多同时存在 size 个；全部被占用时 acquire 等待。
+    借出前检查 driver 是否仍然可用，失效的直接丢弃并新建；
+    每个 driver 渲染 max_pages 个页面后退出重建，避免浏览器进程内存持续增长。
+    chromedriver 的路径只在第一次创建 driver 时解析一次。
+    profile 为默认渲染配置，acquire 时可以为单个任务指定其他配置。
+    """
+
+    def __init__(self, size=2, max_pages=100, page_load_timeout=30, logger=None, profile="text"):
+        self.size = size
+        self.profile = resolve_profile(profile)
+        self.max_pages = max_pages
+        self.page_load_timeout = page_load_timeout
+        self.logger = logger or logging.getLogger(__name__)
+        self._cond = threading.Condition()
+        self._idle = []        # [(driver, 已渲染页面数)]
+        self._created = 0      # 已创建且未退出的 driver 数（含借出的）
+        self._pages = {}       # id(driver) -> 已渲染页面数
+        self._blocked = {}     # id(driver) -> 当前生效的屏蔽模式
+        self._service_path = None
+        self._closed = False
+
+    def _build_options(self):
+        options = Options()
+        options.add_argument("--headless")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1280,800")
+        options.add_argument("--mute-audio")
+        options.add_argument(f"user-agent={USER_AGENT}")
+        return options
+
+    def _create_driver(self):
+        if self._service_path is None:
+            self._service_path = ChromeDriverManager().install()
+        driver = webdriver.Chrome(service=Service(self._service_path), options=self._build_options())
+        driver.set_page_load_timeout(self.page_load_timeout)
+        self.logger.info("Selenium driver 已启动")
+        return driver
+
+    @staticmethod
+    def _is_alive(driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _apply_profile(self, driver, profile):
+        patterns = profile.blocked_urls()
+        if self._blocked.get(id(driver)) == patterns:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+            self._blocked[id(driver)] = patterns
+        except Exception as e:
+            self.logger.warning(f"设置资源屏蔽失败: {e}")
+
+    def _quit(self, driver):
+        self._blocked.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None, profile=None):
+        """借出一个可用的 driver，超时返回 None；创建失败时抛出异常
+
+        profile 为本次使用的渲染配置，None 时使用池的默认配置。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("driver 池已关闭")
+                if self._idle:
+                    driver, pages = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    driver, pages = None, 0
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+        # 健康检查和创建都可能很慢，不持有锁
+        if driver is not None and not self._is_alive(driver):
+            self.logger.info("Selenium driver 已失效，重新创建")
+            self._quit(driver)
+            driver = None
+        if driver is None:
+            try:
+                driver = self._create_driver()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+        self._apply_profile(driver, self.profile if profile is None else resolve_profile(profile))
+        with self._cond:
+            self._pages[id(driver)] = pages
+        return driver
+
+    def release(self, driver, broken=False):
+        """归还 driver；broken 为 True 或渲染页面数达到 max_pages 时退出该 driver"""
+        with self._cond:
+            pages = self._pages.pop(id(driver), 0) + 1
+            recycle = broken or self._closed or (self.max_pages and pages >= self.max_pages)
+            if not recycle:
+                self._idle.append((driver, pages))
+            else:
+                self._created -= 1
+            self._cond.notify()
+        if recycle:
+            self._quit(driver)
+
+    @contextmanager
+    def driver(self, timeout=None, profile=None):
+        """with pool.driver() as driver: ...，无可用 driver 时得到 None"""
+        driver = self.acquire(timeout, profile)
+        if driver is None:
+            yield None
+            return
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, broken=not self._is_alive(driver))
+            raise
+        else:
+            self.release(driver)
+
+    def close(self):
+        """退出所有空闲 driver，借出中的 driver 归还时退出"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for driver, _ in idle:
+            self._quit(driver)
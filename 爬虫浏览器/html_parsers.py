@@ -0,0 +1,34 @@
+from bs4 import BeautifulSoup
+from utils import LXML_AVAILABLE, HTML5LIB_AVAILABLE
+
+# 解析后端名称 -> BeautifulSoup 树构建器
+# lxml: C 实现，最快；html5lib: 与浏览器一致的容错解析，最慢；html.parser: 标准库，无额外依赖
+PARSER_BACKENDS = {
+    "lxml": "lxml",
+    "html5lib": "html5lib",
+    "html.parser": "html.parser",
+}
+
+
+def available_backends():
+    """返回当前环境可用的解析后端，按速度从快到慢排列"""
+    backends = []
+    if LXML_AVAILABLE:
+        backends.append("lxml")
+    backends.append("html.parser")
+    if HTML5LIB_AVAILABLE:
+        backends.append("html5lib")
+    return backends
+
+
+def resolve_backend(name="auto"):
+    """解析后端名称；"auto" 或不可用的后端回退到最快的可用后端"""
+    available = available_backends()
+    if name in available:
+        return name
+    return available[0]
+
+
+def parse_html(markup, backend="auto"):
+    """用指定后端把 HTML（str 或 bytes）解析为 BeautifulSoup，供 extract_page_data 使用"""
+    return BeautifulSoup(markup, PARSER_BACKENDS[resolve_backend(backend)])
@@ -0,0 +1,258 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError, ConnectTimeoutError
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "application/xml", "text/xml", "text/plain")
+
+
+class RejectedResponse(Exception):
+    """响应类型或大小不符合要求，已在下载正文前/中途放弃"""
+
+
+class NotModified(Exception):
+    """条件请求命中：页面自上次抓取以来没有变化"""
+
+
+class _CachedDnsConnection:
+    """建立连接时从 DnsCache 取地址，依次尝试；连不上的地址从缓存中去掉
+
+    只替换用于建立 TCP 连接的 _dns_host，Host 头和 TLS 的 SNI/证书校验仍使用原主机名。
+    """
+
+    dns_cache = None
+
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            addresses = self.dns_cache.resolve(host)
+        except OSError:
+            # 交给 urllib3 按原流程解析并生成 NameResolutionError
+            return super()._new_conn()
+        error = None
+        for address in addresses:
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except (NewConnectionError, ConnectTimeoutError) as e:
+                self.dns_cache.invalidate(host, address)
+                error = e
+            finally:
+                self._dns_host = host
+        raise error
+
+
+class CachedDnsAdapter(HTTPAdapter):
+    """连接池使用 DnsCache 解析主机名的 HTTPAdapter"""
+
+    def __init__(self, dns_cache, **kwargs):
+        http_conn = type("CachedDnsHTTPConnection", (_CachedDnsConnection, HTTPConnection),
+                         {"dns_cache": dns_cache})
+        https_conn = type("CachedDnsHTTPSConnection", (_CachedDnsConnection, HTTPSConnection),
+                          {"dns_cache": dns_cache})
+        self._pool_classes = {
+            "http": type("CachedDnsHTTPConnectionPool", (HTTPConnectionPool,), {"ConnectionCls": http_conn}),
+            "https": type("CachedDnsHTTPSConnectionPool", (HTTPSConnectionPool,), {"ConnectionCls": https_conn}),
+        }
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+
+class CrawlerHttpClient:
+    """爬虫专用HTTP客户端，按主机维护keep-alive连接池
+
+    pool_connections: 同时缓存的主机连接池数量
+    pool_maxsize: 每个主机连接池保留的最大连接数，应不小于单主机并发数
+    dns_cache: DnsCache 实例，为 None 时使用系统解析器
+    """
+
+    def __init__(self, pool_connections=64, pool_maxsize=8, timeout=10, headers=None, dns_cache=None):
+        self.timeout = timeout
+        self.dns_cache = dns_cache
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._lock = threading.Lock()
+        self.session = self._create_session(headers)
+
+    def _create_adapter(self):
+        if self.dns_cache is not None:
+            return CachedDnsAdapter(
+                self.dns_cache,
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+                max_retries=0,
+            )
+        return HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=0,
+        )
+
+    def _create_session(self, headers):
+        session = requests.Session()
+        session.headers.clear()
+        session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            session.headers.update(headers)
+        adapter = self._create_adapter()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @property
+    def headers(self):
+        """所有请求共享的默认请求头"""
+        return self.session.headers
+
+    def resize_pools(self, pool_connections=None, pool_maxsize=None):
+        """调整连接池大小，已有的空闲连接会被关闭"""
+        with self._lock:
+            if pool_connections:
+                self.pool_connections = pool_connections
+            if pool_maxsize:
+                self.pool_maxsize = pool_maxsize
+            adapter = self._create_adapter()
+            old = self.session.get_adapter('https://')
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+            old.close()
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', True)
+        return self.request('HEAD', url, **kwargs)
+
+    def fetch_html(self, url, max_bytes=5 * 1024 * 1024, allowed_types=HTML_CONTENT_TYPES,
+                   chunk_size=64 * 1024, **kwargs):
+        """流式下载网页正文
+
+        先检查 Content-Type 和 Content-Length，非网页或超过 max_bytes 的响应直接放弃，
+        不下载正文；没有 Content-Length 的响应按块读取，最多读取 max_bytes 字节
+        （已解压的字节数），超出部分丢弃。返回 (response, 正文 bytes)，304 响应的正文为空。
+        """
+        response = self.get(url, stream=True, **kwargs)
+        try:
+            if response.status_code == 304:
+                return response, b''
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type and allowed_types and content_type not in allowed_types:
+                raise RejectedResponse(f"不支持的内容类型 {content_type}")
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and max_bytes and int(length) > max_bytes:
+                raise RejectedResponse(f"内容过大 ({int(length)} 字节)")
+
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                chunks.append(chunk)
+                received += len(chunk)
+                if max_bytes and received >= max_bytes:
+                    break
+            body = b''.join(chunks)
+            if max_bytes and len(body) > max_bytes:
+                body = body[:max_bytes]
+            return response, body
+        finally:
+            # 已读完时连接回到连接池；中途放弃时连接被关闭
+            response.close()
+
+    def _connection_pool(self, url):
+        """返回 requests 发送该 URL 时实际使用的 urllib3 连接池
+
+        必须和 HTTPAdapter.send 用同样的参数取池（包括 TLS 设置和代理），
+        否则 connection_from_url 会得到另一个池，预热的连接不会被请求用到。
+        """
+        adapter = self.session.get_adapter(url)
+        settings = self.session.merge_environment_settings(url, {}, None, None, None)
+        if hasattr(adapter, "get_connection_with_tls_context"):
+            request = requests.Request("GET", url).prepare()
+            return adapter.get_connection_with_tls_context(
+                request, settings["verify"], proxies=settings["proxies"], cert=settings["cert"]
+            )
+        return adapter.get_connection(url, settings["proxies"])
+
+    def prewarm(self, url):
+        """提前解析主机名并建立一个连接（含 TLS 握手）放入连接池，不发送任何请求
+
+        连接池已有空闲连接时不做任何事。返回是否新建了连接。
+        """
+        pool = self._connection_pool(url)
+        # urllib3 没有公开的预连接接口，这里直接从连接池取出/放回连接
+        conn = pool._get_conn(timeout=0)
+        try:
+            if conn.sock is None:
+                conn.timeout = self.timeout
+                conn.connect()
+                created = True
+            else:
+                created = False
+        except Exception:
+            conn.close()
+            raise
+        finally:
+            pool._put_conn(conn)
+        return created
+
+    def close(self):
+        self.session.close()
+
+
+class ConnectionPrewarmer:
+    """在后台线程中为即将抓取的主机预先解析 DNS、建立连接
+
+    同一主机 interval 秒内只预热一次；预热失败忽略，正式请求时按正常流程处理。
+    """
+
+    def __init__(self, http, max_workers=4, interval=30.0):
+        self.http = http
+        self.interval = interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prewarm")
+        self._recent = {}  # scheme://host -> 上次预热时间
+        self._lock = threading.Lock()
+
+    def warm(self, url):
+        parsed = urlparse(url)
+        key = f"{parsed.scheme}://{parsed.netloc.lower()}"
+        now = time.monotonic()
+        with self._lock:
+            last = self._recent.get(key)
+            if last is not None and now - last < self.interval:
+                return
+            self._recent[key] = now
+            if len(self._recent) > 10000:
+                self._recent = {k: t for k, t in self._recent.items() if now - t < self.interval}
+        self._executor.submit(self._warm, url)
+
+    def _warm(self, url):
+        try:
+            self.http.prewarm(url)
+        except Exception as e:
+            logging.getLogger(__name__).debug(f"预热连接失败 {url}: {e}")
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
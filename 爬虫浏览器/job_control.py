@@ -0,0 +1,38 @@
+import threading
+
+
+class JobControl:
+    """抓取任务的暂停、继续和取消
+
+    由界面线程调用 pause / resume / cancel，抓取线程在派发新页面前调用 checkpoint()：
+    暂停时阻塞直到继续或取消，返回 False 表示任务已取消、不应再派发新页面。
+    已经开始的请求不受影响。
+    """
+
+    def __init__(self):
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def pause(self):
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()
+
+    def checkpoint(self):
+        self._running.wait()
+        return not self._cancelled.is_set()
@@ -0,0 +1,232 @@
+import sqlite3
+import threading
+from utils import NUMPY_AVAILABLE, SCIPY_AVAILABLE
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+if SCIPY_AVAILABLE:
+    import scipy.sparse
+
+# 按 URL 批量查询得分时每条 SQL 的参数个数（SQLite 默认上限 999）
+_BATCH = 500
+
+
+class LinkGraph:
+    """已抓取页面的出链图（SQLite）及页面重要性得分
+
+    安装了 NumPy 时计算近似 PageRank（有 SciPy 时用稀疏矩阵），每次从上次的结果开始迭代，
+    新增少量页面后只需几轮迭代即可收敛；边数组缓存在内存中，每次只重新读取新抓取页面的出链。
+    没有 NumPy 时退化为入链数，完全在 SQLite 中计算。
+    得分写入 url_scores 视图 (url, score)，按平均值归一化为 1，抓取队列可直接用它批量更新优先级。
+    上次计算之后才出现的URL由 scores() 按当前入链数给出临时得分（同样归一化），不会一律排在最后。
+    本次打开后新抓取的页面数达到 max(rescore_every, 上次计算时的页面数 * rescore_growth) 时 due() 为真：
+    起初每 rescore_every 页计算一次，页面多了以后按比例拉开间隔，总计算量随页面数近似线性增长。
+    """
+
+    SCORE_VIEW = "url_scores"
+
+    def __init__(self, path, damping=0.85, max_iterations=50, tolerance=1e-6, max_outlinks=500,
+                 rescore_every=50, rescore_growth=0.1):
+        self.path = path
+        self.damping = damping
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.max_outlinks = max_outlinks
+        self.rescore_every = rescore_every
+        self.rescore_growth = rescore_growth
+        self._lock = threading.Lock()
+        self._rank = None       # 上次的 PageRank 向量，下标为节点 id
+        self._edge_src = None   # 缓存的边数组
+        self._edge_dst = None
+        self._changed = set()   # 上次计算后出链有变化的页面 id
+        self._pages = 0         # 本次打开后 add_page 的页面数
+        self._scored_pages = 0  # 上次计算时的 _pages
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS nodes (id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS edges (
+                src INTEGER NOT NULL,
+                dst INTEGER NOT NULL,
+                PRIMARY KEY (src, dst)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS scores (id INTEGER PRIMARY KEY, score REAL NOT NULL)")
+        self.conn.execute(f"""
+            CREATE VIEW IF NOT EXISTS {self.SCORE_VIEW} AS
+            SELECT nodes.url AS url, scores.score AS score FROM scores JOIN nodes ON nodes.id = scores.id
+        """)
+        self.conn.commit()
+        self._node_count = self.conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+        self._edge_count = self.conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+
+    def _node_ids(self, urls):
+        cur = self.conn.executemany("INSERT OR IGNORE INTO nodes (url) VALUES (?)", ((u,) for u in urls))
+        self._node_count += max(cur.rowcount, 0)
+        ids = {}
+        for url in urls:
+            ids[url] = self.conn.execute("SELECT id FROM nodes WHERE url=?", (url,)).fetchone()[0]
+        return ids
+
+    def add_page(self, url, outlinks):
+        """记录页面的出链，替换该页面之前的出链"""
+        targets = list(dict.fromkeys(link for link in outlinks if link != url))[:self.max_outlinks]
+        with self._lock:
+            ids = self._node_ids([url] + targets)
+            src = ids[url]
+            deleted = self.conn.execute("DELETE FROM edges WHERE src=?", (src,)).rowcount
+            inserted = self.conn.executemany(
+                "INSERT OR IGNORE INTO edges (src, dst) VALUES (?, ?)", ((src, ids[t]) for t in targets)
+            ).rowcount
+            self.conn.commit()
+            self._edge_count += max(inserted, 0) - max(deleted, 0)
+            self._changed.add(src)
+            self._pages += 1
+
+    def due(self):
+        """新增页面是否已多到需要重新计算得分"""
+        with self._lock:
+            new_pages = self._pages - self._scored_pages
+            return new_pages >= max(self.rescore_every, self._scored_pages * self.rescore_growth)
+
+    def _load_edges(self, changed):
+        """返回全部边的 (src, dst) 数组：首次从数据库整体读取，之后只替换 changed 中页面的出链"""
+        if self._edge_src is None:
+            cur = self.conn.execute("SELECT src, dst FROM edges")
+            pairs = np.fromiter((v for row in cur for v in row), dtype=np.int64).reshape(-1, 2)
+            return pairs[:, 0].copy(), pairs[:, 1].copy()
+        keep = ~np.isin(self._edge_src, np.fromiter(changed, dtype=np.int64, count=len(changed)))
+        src, dst = [self._edge_src[keep]], [self._edge_dst[keep]]
+        ids = list(changed)
+        for i in range(0, len(ids), _BATCH):
+            chunk = ids[i:i + _BATCH]
+            cur = self.conn.execute(
+                f"SELECT src, dst FROM edges WHERE src IN ({','.join('?' * len(chunk))})", chunk
+            )
+            pairs = np.fromiter((v for row in cur for v in row), dtype=np.int64).reshape(-1, 2)
+            src.append(pairs[:, 0])
+            dst.append(pairs[:, 1])
+        return np.concatenate(src), np.concatenate(dst)
+
+    def _pagerank(self, n, src, dst, previous):
+        count = n - 1  # 下标 0 不对应任何节点
+        outdeg = np.bincount(src, minlength=n).astype(np.float64)
+        dangling = outdeg == 0
+        dangling[0] = False
+
+        rank = np.full(n, 1.0 / count)
+        if previous is not None:
+            # 从上次的结果开始迭代，新节点取均值
+            size = min(len(previous), n)
+            rank[:size] = previous[:size]
+        rank[0] = 0.0
+        rank /= rank.sum()
+
+        matrix = None
+        if SCIPY_AVAILABLE and len(src):
+            matrix = scipy.sparse.csr_matrix((1.0 / outdeg[src], (dst, src)), shape=(n, n))
+        for _ in range(self.max_iterations):
+            if matrix is not None:
+                spread = matrix @ rank
+            elif len(src):
+                spread = np.bincount(dst, weights=rank[src] / outdeg[src], minlength=n)
+            else:
+                spread = np.zeros(n)
+            new = (1.0 - self.damping) / count + self.damping * (spread + rank[dangling].sum() / count)
+            new[0] = 0.0
+            new /= new.sum()
+            delta = np.abs(new - rank).sum()
+            rank = new
+            if delta < self.tolerance:
+                break
+        return rank
+
+    def compute(self):
+        """重新计算得分并写入 scores 表
+
+        只在读取变化的出链和写回得分时持有锁，迭代期间抓取线程可以继续 add_page。
+        """
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            self._scored_pages = self._pages
+            n = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM nodes").fetchone()[0] + 1
+            if n <= 1:
+                return
+            if not NUMPY_AVAILABLE:
+                total = self.conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+                self.conn.execute("DELETE FROM scores")
+                if total:
+                    self.conn.execute(
+                        "INSERT INTO scores (id, score) SELECT dst, COUNT(*) * ? FROM edges GROUP BY dst",
+                        ((n - 1) / total,),
+                    )
+                self.conn.commit()
+                return
+            src, dst = self._load_edges(changed)
+            self._edge_src, self._edge_dst = src, dst
+            previous = self._rank
+
+        rank = self._pagerank(n, src, dst, previous)
+        scores = rank * (n - 1)
+
+        with self._lock:
+            self._rank = rank
+            self.conn.execute("DELETE FROM scores")
+            self.conn.executemany(
+                "INSERT INTO scores (id, score) VALUES (?, ?)",
+                zip(range(1, n), scores[1:].tolist()),
+            )
+            self.conn.commit()
+
+    def scores(self, urls):
+        """批量返回 {url: 得分}，平均得分为 1
+
+        还没有得分的URL按当前入链数给出临时得分，不在图中的URL为 0。
+        """
+        urls = list(urls)
+        result = dict.fromkeys(urls, 0.0)
+        with self._lock:
+            missing = []
+            for i in range(0, len(urls), _BATCH):
+                chunk = urls[i:i + _BATCH]
+                found = dict(self.conn.execute(
+                    f"SELECT url, score FROM {self.SCORE_VIEW} WHERE url IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ))
+                result.update(found)
+                missing.extend(url for url in chunk if url not in found)
+            if missing and self._edge_count:
+                scale = self._node_count / self._edge_count
+                for i in range(0, len(missing), _BATCH):
+                    chunk = missing[i:i + _BATCH]
+                    for url, indegree in self.conn.execute(
+                        "SELECT nodes.url, COUNT(*) FROM nodes JOIN edges ON edges.dst = nodes.id "
+                        f"WHERE nodes.url IN ({','.join('?' * len(chunk))}) GROUP BY nodes.url",
+                        chunk,
+                    ):
+                        result[url] = indegree * scale
+        return result
+
+    def score(self, url):
+        return self.scores([url])[url]
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM scores")
+            self.conn.execute("DELETE FROM edges")
+            self.conn.execute("DELETE FROM nodes")
+            self.conn.commit()
+            self._rank = None
+            self._edge_src = self._edge_dst = None
+            self._changed.clear()
+            self._pages = self._scored_pages = 0
+            self._node_count = self._edge_count = 0
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
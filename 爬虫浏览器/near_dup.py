@@ -0,0 +1,204 @@
+import re
+import random
+import struct
+import sqlite3
+import hashlib
+import threading
+from utils import NUMPY_AVAILABLE
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+# 中日韩字符逐字切分，其余按单词切分
+_CJK = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_TOKEN_RE = re.compile(rf"[{_CJK}]|[^\W_{_CJK}]+")
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = 0xFFFFFFFF
+
+
+def tokenize(text):
+    """中日韩文本按字切分，西文按词切分并转小写，忽略标点和空白"""
+    return [t.lower() for t in _TOKEN_RE.findall(text or "")]
+
+
+def shingles(text, k=5):
+    """返回长度为 k 的 token 片段集合（以 32 位哈希表示）"""
+    tokens = tokenize(text)
+    if len(tokens) < k:
+        return set()
+    result = set()
+    for i in range(len(tokens) - k + 1):
+        piece = "\x1f".join(tokens[i:i + k]).encode("utf-8")
+        result.add(struct.unpack("<I", hashlib.blake2b(piece, digest_size=4).digest())[0])
+    return result
+
+
+def choose_bands(num_perm, threshold):
+    """选择 (bands, rows)，使 LSH 的 S 曲线拐点 (1/b)^(1/r) 不高于 threshold 且尽量接近
+
+    拐点略低于阈值可减少漏检，多出的候选文档由签名相似度再过滤一次。
+    """
+    best = (num_perm, 1)
+    best_point = 0.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        point = (1.0 / bands) ** (1.0 / rows)
+        if best_point < point <= threshold:
+            best, best_point = (bands, rows), point
+    return best
+
+
+class MinHasher:
+    """MinHash 签名生成器，安装了 numpy 时使用向量化计算"""
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.a = [rng.randrange(1, 1 << 31) for _ in range(num_perm)]
+        self.b = [rng.randrange(0, 1 << 32) for _ in range(num_perm)]
+        if NUMPY_AVAILABLE:
+            self._a = np.array(self.a, dtype=np.uint64)
+            self._b = np.array(self.b, dtype=np.uint64)
+
+    def signature(self, shingle_set):
+        if not shingle_set:
+            return None
+        if NUMPY_AVAILABLE:
+            x = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+            hv = (np.outer(x, self._a) + self._b) % np.uint64(_MERSENNE) & np.uint64(_MAX_HASH)
+            return [int(v) for v in hv.min(axis=0)]
+        return [
+            min(((a * x + b) % _MERSENNE) & _MAX_HASH for x in shingle_set)
+            for a, b in zip(self.a, self.b)
+        ]
+
+
+class NearDuplicateIndex:
+    """基于 MinHash-LSH 的近似重复文档索引（持久化到 SQLite）
+
+    每篇文档切分为 k-shingle 后计算 MinHash 签名，签名分成若干 band
+    写入索引表；查询时只比较至少一个 band 完全相同的候选文档，
+    因而检查一篇新文档的代价与索引规模基本无关。
+    候选文档再以签名估计的 Jaccard 相似度与 threshold 比较。
+    """
+
+    def __init__(self, path=":memory:", threshold=0.8, num_perm=128, shingle_size=5):
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        self.hasher = MinHasher(num_perm)
+        self._sig_struct = struct.Struct(f"<{num_perm}I")
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, url TEXT UNIQUE, signature BLOB)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (band INTEGER, bucket INTEGER, doc_id INTEGER)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets ON buckets(band, bucket)")
+        self._check_params()
+        self.conn.commit()
+
+    def _check_params(self):
+        params = f"{self.num_perm}:{self.bands}:{self.rows}:{self.shingle_size}"
+        row = self.conn.execute("SELECT value FROM meta WHERE key='params'").fetchone()
+        if row is None:
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('params', ?)", (params,))
+        elif row[0] != params:
+            raise ValueError(f"去重索引参数不一致（已有 {row[0]}，当前 {params}），请更换索引文件")
+
+    def _band_keys(self, signature):
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(struct.pack(f"<{self.rows}I", *chunk), digest_size=8).digest()
+            keys.append((band, struct.unpack("<q", digest)[0]))
+        return keys
+
+    def signature(self, text):
+        """计算文本的 MinHash 签名，不访问索引，可在抓取线程中并行调用"""
+        return self.hasher.signature(shingles(text, self.shingle_size))
+
+    @staticmethod
+    def similarity(sig1, sig2):
+        """由 MinHash 签名估计 Jaccard 相似度"""
+        return sum(1 for x, y in zip(sig1, sig2) if x == y) / len(sig1)
+
+    def _find(self, signature, keys):
+        best_url, best_sim = None, 0.0
+        candidates = set()
+        for band, bucket in keys:
+            for (doc_id,) in self.conn.execute(
+                "SELECT doc_id FROM buckets WHERE band=? AND bucket=?", (band, bucket)
+            ):
+                candidates.add(doc_id)
+        for doc_id in candidates:
+            url, blob = self.conn.execute(
+                "SELECT url, signature FROM docs WHERE id=?", (doc_id,)
+            ).fetchone()
+            sim = self.similarity(signature, self._sig_struct.unpack(blob))
+            if sim > best_sim:
+                best_url, best_sim = url, sim
+        if best_sim >= self.threshold:
+            return best_url, best_sim
+        return None, best_sim
+
+    def query(self, text):
+        """查找近似重复文档，返回 (url, 相似度)，没有时 url 为 None"""
+        signature = self.signature(text)
+        if signature is None:
+            return None, 0.0
+        with self._lock:
+            return self._find(signature, self._band_keys(signature))
+
+    def check_and_add(self, url, text, signature=None):
+        """若 text 与已收录文档近似重复，返回 (重复文档url, 相似度)；否则收录并返回 (None, 相似度)
+
+        signature 为事先用 self.signature(text) 算好的签名，传入时不再重新计算。
+        文本过短（不足一个 shingle）时不参与去重。
+        """
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return None, 0.0
+        keys = self._band_keys(signature)
+        with self._lock:
+            dup_url, sim = self._find(signature, keys)
+            if dup_url is not None and dup_url != url:
+                return dup_url, sim
+            if dup_url is None:
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO docs (url, signature) VALUES (?, ?)",
+                    (url, self._sig_struct.pack(*signature)),
+                )
+                if cur.rowcount:
+                    self.conn.executemany(
+                        "INSERT INTO buckets (band, bucket, doc_id) VALUES (?, ?, ?)",
+                        ((band, bucket, cur.lastrowid) for band, bucket in keys),
+                    )
+                self.conn.commit()
+            return None, sim
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def clear(self):
+        """删除全部已收录文档"""
+        with self._lock:
+            self.conn.execute("DELETE FROM buckets")
+            self.conn.execute("DELETE FROM docs")
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
@@ -0,0 +1,117 @@
+import json
+from urllib.parse import urlparse, urljoin, urldefrag
+from bs4.element import Tag, NavigableString, CData
+
+# 不计入正文、链接和图片的标签
+SKIP_TAGS = {"script", "style", "nav", "footer", "header"}
+# 作为正文段落收集的标签
+BLOCK_TAGS = {"p", "h1", "h2", "h3", "li"}
+TEXT_TYPES = (NavigableString, CData)
+
+
+class PageParts:
+    """一次遍历得到的页面原始信息"""
+
+    __slots__ = ("title", "blocks", "links", "internal_links", "external_links", "all_links",
+                 "images", "meta_description", "canonical_url", "opengraph", "json_ld")
+
+    def __init__(self):
+        self.title = None
+        self.blocks = []           # 段落文本，按开始标签在文档中的顺序
+        self.links = []            # 正文区域（不含 nav/header/footer 等）的链接
+        self.internal_links = 0
+        self.external_links = 0
+        self.all_links = []        # 全部 http(s) 链接（去掉锚点），用于站点抓取的队列
+        self.images = []
+        self.meta_description = ""
+        self.canonical_url = ""
+        self.opengraph = {}
+        self.json_ld = []
+
+
+def _handle_head_tag(tag, name, parts, current_url):
+    """处理 meta / link / JSON-LD，这些标签位于 head 或被跳过的区域中也需要读取"""
+    if name == "meta":
+        content = tag.get("content")
+        if content is None:
+            return
+        key = (tag.get("name") or "").lower()
+        prop = (tag.get("property") or "").lower()
+        if key == "description" and not parts.meta_description:
+            parts.meta_description = content.strip()
+        elif prop.startswith("og:"):
+            parts.opengraph.setdefault(prop[3:], content.strip())
+    elif name == "link":
+        rel = tag.get("rel") or []
+        if isinstance(rel, str):
+            rel = rel.split()
+        if "canonical" in (r.lower() for r in rel) and tag.get("href") and not parts.canonical_url:
+            parts.canonical_url = urljoin(current_url, tag["href"].strip())
+    elif name == "script" and (tag.get("type") or "").lower() == "application/ld+json":
+        raw = tag.string
+        if raw:
+            try:
+                parts.json_ld.append(json.loads(raw))
+            except ValueError:
+                pass
+
+
+def extract_parts(soup, current_url):
+    """单次遍历 DOM，同时收集标题、正文段落、链接（一次分类）、图片、
+    meta 描述、canonical、OpenGraph 和 JSON-LD。不修改 soup。
+    """
+    parts = PageParts()
+    site = urlparse(current_url).netloc
+    open_blocks = []  # 当前所在的段落标签在 blocks 中的下标，嵌套时文本计入每一层
+
+    stack = [(soup, False)]
+    skip_depth = 0
+    while stack:
+        node, leaving = stack.pop()
+        if leaving:
+            name = node.name
+            if name in SKIP_TAGS:
+                skip_depth -= 1
+            elif skip_depth == 0 and name in BLOCK_TAGS:
+                open_blocks.pop()
+            continue
+
+        if isinstance(node, TEXT_TYPES):
+            if skip_depth == 0 and open_blocks and type(node) in (NavigableString, CData):
+                for idx in open_blocks:
+                    parts.blocks[idx].append(str(node))
+            continue
+        if not isinstance(node, Tag):
+            continue
+
+        name = node.name
+        if name in ("meta", "link", "script"):
+            _handle_head_tag(node, name, parts, current_url)
+
+        if name == "a" and node.get("href") is not None:
+            link = urljoin(current_url, node["href"])
+            parsed = urlparse(link)
+            if parsed.scheme in ("http", "https") and parsed.netloc:
+                parts.all_links.append(urldefrag(link)[0])
+            if skip_depth == 0:
+                parts.links.append(link)
+                if parsed.netloc == site:
+                    parts.internal_links += 1
+                else:
+                    parts.external_links += 1
+        elif name == "img" and skip_depth == 0 and node.get("src") is not None:
+            parts.images.append(node["src"])
+        elif name == "title" and parts.title is None and skip_depth == 0:
+            parts.title = node.get_text()
+
+        if name in SKIP_TAGS:
+            skip_depth += 1
+        elif skip_depth == 0 and name in BLOCK_TAGS:
+            open_blocks.append(len(parts.blocks))
+            parts.blocks.append([])
+
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(node.contents))
+
+    parts.blocks = ["".join(pieces) for pieces in parts.blocks]
+    return parts
@@ -0,0 +1,115 @@
+"""HTML 解析后端基准测试
+
+对一个目录中保存的网页（*.html / *.htm）分别用各解析后端执行
+parse_html + extract_page_data，比较吞吐量以及与 html.parser 结果的一致性。
+
+用法:
+    python parser_benchmark.py 页面目录 [--backends lxml html.parser html5lib] [--repeat 3]
+    python parser_benchmark.py 页面目录 --fetch urls.txt    # 先下载URL列表中的页面保存到目录
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+from crawler_worker import CrawlerWorker
+from html_parsers import available_backends, parse_html
+
+COMPARE_FIELDS = ("title", "full_content", "total_links", "internal_links", "external_links", "images")
+
+
+def fetch_corpus(worker, url_file, directory):
+    """下载 url_file 中列出的页面到 directory，文件名为 URL 的哈希，首行注释记录原始 URL"""
+    os.makedirs(directory, exist_ok=True)
+    with open(url_file, 'r', encoding='utf-8') as f:
+        urls = [line.strip() for line in f if line.strip()]
+    saved = 0
+    for url in urls:
+        try:
+            response = worker.http.get(url)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"下载失败 {url}: {e}")
+            continue
+        name = hashlib.md5(url.encode('utf-8')).hexdigest() + ".html"
+        with open(os.path.join(directory, name), 'wb') as out:
+            out.write(f"<!-- url: {url} -->\n".encode('utf-8'))
+            out.write(response.content)
+        saved += 1
+    print(f"已保存 {saved}/{len(urls)} 个页面到 {directory}")
+
+
+def load_corpus(directory):
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(('.html', '.htm')):
+            continue
+        with open(os.path.join(directory, name), 'rb') as f:
+            content = f.read()
+        url = "https://example.com/" + name
+        if content.startswith(b"<!-- url: "):
+            url = content[len(b"<!-- url: "):content.index(b" -->")].decode('utf-8')
+        pages.append((url, content))
+    return pages
+
+
+def run_backend(worker, backend, pages, repeat):
+    results = []
+    best = float("inf")
+    for _ in range(repeat):
+        results = []
+        start = time.perf_counter()
+        for url, content in pages:
+            soup = parse_html(content, backend)
+            results.append(worker.extract_page_data(soup, url))
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def same_output(a, b):
+    return all(a.get(field) == b.get(field) for field in COMPARE_FIELDS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTML 解析后端基准测试")
+    parser.add_argument("corpus", help="保存网页的目录")
+    parser.add_argument("--backends", nargs="+", default=available_backends())
+    parser.add_argument("--repeat", type=int, default=3, help="每个后端重复次数，取最快一次")
+    parser.add_argument("--fetch", metavar="URL_FILE", help="先下载URL列表中的页面到 corpus 目录")
+    args = parser.parse_args(argv)
+
+    worker = CrawlerWorker(output_dir=tempfile.mkdtemp(prefix="parser_bench_"), near_dup_action=None)
+    try:
+        if args.fetch:
+            fetch_corpus(worker, args.fetch, args.corpus)
+        pages = load_corpus(args.corpus)
+        if not pages:
+            print("目录中没有 HTML 页面")
+            return 1
+        total_bytes = sum(len(content) for _, content in pages)
+        print(f"语料: {len(pages)} 个页面, {total_bytes / 1024 / 1024:.1f} MB, 每个后端重复 {args.repeat} 次\n")
+
+        baseline = None
+        if "html.parser" in available_backends():
+            _, baseline = run_backend(worker, "html.parser", pages, 1)
+
+        print(f"{'后端':<12}{'耗时(s)':>10}{'页/秒':>10}{'MB/秒':>10}{'与html.parser一致':>20}")
+        for backend in args.backends:
+            if backend not in available_backends():
+                print(f"{backend:<12}{'未安装':>10}")
+                continue
+            elapsed, results = run_backend(worker, backend, pages, args.repeat)
+            same = sum(1 for a, b in zip(results, baseline) if same_output(a, b)) if baseline else 0
+            print(
+                f"{backend:<12}{elapsed:>10.3f}{len(pages) / elapsed:>10.1f}"
+                f"{total_bytes / 1024 / 1024 / elapsed:>10.2f}"
+                f"{f'{same}/{len(pages)} ({same / len(pages):.0%})':>20}"
+            )
+    finally:
+        worker.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
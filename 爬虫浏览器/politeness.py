@@ -0,0 +1,286 @@
+import time
+import heapq
+import threading
+import itertools
+from collections import deque, defaultdict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# 这些状态码表示服务器要求降低请求频率
+THROTTLE_STATUS = (429, 503)
+
+
+class HostThrottled(Exception):
+    """主机处于退避期，等待时间超过调用方允许的上限"""
+
+
+def host_key(url):
+    return urlparse(url).netloc.lower()
+
+
+def parse_retry_after(value, now=None):
+    """解析 Retry-After（秒数或 HTTP 日期），返回需要等待的秒数，无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+class _HostState:
+    __slots__ = ("tokens", "updated", "crawl_delay", "blocked_until", "penalty")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.crawl_delay = None   # None 表示尚未读取 robots.txt
+        self.blocked_until = 0.0
+        self.penalty = 0          # 连续被限流的次数
+
+
+class PolitenessScheduler:
+    """按主机限制请求频率
+
+    每个主机一个令牌桶：每秒补充 rate 个令牌，最多积累 burst 个；
+    robots.txt 指定了 Crawl-delay / Request-rate 时速率不超过它，且不允许突发。
+    收到 429/503 时按 Retry-After 暂停该主机，没有 Retry-After 时按
+    backoff_base * 2^(连续次数-1) 指数退避（不超过 max_backoff 秒）；请求成功后退避清零。
+    delay_fn(url) 返回 robots.txt 要求的最小间隔，每个主机只在第一次请求前调用一次；
+    读到之前该主机按容量为 1 的令牌桶处理，不会在得知 Crawl-delay 前连发 burst 个请求。
+
+    两种用法：
+    - wait(url)：请求前阻塞直到该主机有令牌，用于单页和站点抓取
+    - HostQueue：批量抓取时由派发线程按各主机的可用时间从堆中取出URL，
+      取出时已扣除令牌，对应的 wait(url) 直接返回
+    """
+
+    def __init__(self, rate=2.0, burst=2, delay_fn=None, backoff_base=5.0, max_backoff=900.0):
+        self.rate = rate
+        self.burst = burst
+        self.delay_fn = delay_fn
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self._hosts = {}
+        self._granted = defaultdict(int)  # 已由 HostQueue 放行、尚未请求的URL
+        self._lock = threading.Lock()
+
+    def _state(self, host, now):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(1 if self.delay_fn else self.burst, now)
+        return state
+
+    def _limits(self, state):
+        """返回 (每秒令牌数, 桶容量)"""
+        if state.crawl_delay:
+            return min(self.rate, 1.0 / state.crawl_delay), 1
+        if state.crawl_delay is None and self.delay_fn is not None:
+            return self.rate, 1
+        return self.rate, self.burst
+
+    def delay_known(self, host):
+        """是否已读取该主机的抓取间隔（没有 delay_fn 时总是 True）"""
+        if self.delay_fn is None:
+            return True
+        with self._lock:
+            state = self._hosts.get(host)
+            return state is not None and state.crawl_delay is not None
+
+    def _refill(self, state, now):
+        rate, capacity = self._limits(state)
+        if now > state.updated:
+            state.tokens = min(capacity, state.tokens + (now - state.updated) * rate)
+            state.updated = now
+
+    def _ready_at(self, state, now):
+        self._refill(state, now)
+        ready = now
+        if state.tokens < 1:
+            rate, _ = self._limits(state)
+            ready = now + (1 - state.tokens) / rate
+        return max(ready, state.blocked_until)
+
+    def ready_at(self, host, now=None):
+        """该主机下一次可以请求的时间（time.monotonic）"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._ready_at(self._state(host, now), now)
+
+    def learn_delay(self, url):
+        """第一次请求某主机前读取 robots.txt 的抓取间隔"""
+        if self.delay_fn is None:
+            return
+        host = host_key(url)
+        with self._lock:
+            state = self._state(host, time.monotonic())
+            if state.crawl_delay is not None:
+                return
+        try:
+            delay = float(self.delay_fn(url) or 0.0)
+        except Exception:
+            delay = 0.0
+        with self._lock:
+            state.crawl_delay = delay
+            _, capacity = self._limits(state)
+            state.tokens = min(state.tokens, capacity)
+
+    def take(self, url, now=None):
+        """主机可用时扣除一个令牌并返回 0，否则返回还需等待的秒数"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._state(host_key(url), now)
+            ready = self._ready_at(state, now)
+            if ready > now:
+                return ready - now
+            state.tokens -= 1
+            return 0.0
+
+    def grant(self, url, now=None):
+        """派发线程放行URL：扣除令牌（允许为负以保持间隔），对应的 wait(url) 不再等待"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._state(host_key(url), now)
+            self._refill(state, now)
+            state.tokens -= 1
+            self._granted[url] += 1
+
+    def revoke(self, url):
+        """撤销尚未被 wait(url) 使用的放行（如请求因熔断未发出），退还令牌"""
+        with self._lock:
+            if not self._granted.get(url):
+                return
+            self._granted[url] -= 1
+            if not self._granted[url]:
+                del self._granted[url]
+            state = self._hosts.get(host_key(url))
+            if state is not None:
+                state.tokens += 1
+
+    def wait(self, url, max_wait=None):
+        """阻塞直到可以请求该URL；需要等待超过 max_wait 秒时抛出 HostThrottled"""
+        with self._lock:
+            if self._granted.get(url):
+                self._granted[url] -= 1
+                if not self._granted[url]:
+                    del self._granted[url]
+                return
+        waited = 0.0
+        while True:
+            delay = self.take(url)
+            if delay <= 0:
+                return
+            if max_wait is not None and waited + delay > max_wait:
+                raise HostThrottled(f"{host_key(url)} 限流中，需等待 {delay:.0f} 秒")
+            time.sleep(delay)
+            waited += delay
+
+    def feedback(self, url, status=None, retry_after=None):
+        """根据响应调整该主机：429/503 时退避，其他响应清除退避"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(host_key(url), now)
+            if status in THROTTLE_STATUS:
+                state.penalty += 1
+                delay = self.backoff_base * (2 ** (state.penalty - 1))
+                if retry_after is not None:
+                    delay = max(delay if state.penalty > 1 else 0.0, retry_after)
+                state.blocked_until = max(state.blocked_until, now + min(delay, self.max_backoff))
+                state.tokens = min(state.tokens, 0.0)
+            elif status is not None:
+                state.penalty = 0
+
+    def blocked_for(self, url):
+        """该主机剩余的退避时间（秒）"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._hosts.get(host_key(url))
+            return max(0.0, state.blocked_until - now) if state else 0.0
+
+
+class HostQueue:
+    """批量抓取的待派发URL，按主机下一次可请求的时间组织成堆
+
+    pop() 以 O(log 主机数) 取出最早可请求的主机的下一个URL，
+    大量主机交替出现，不会因为某个主机限速而让抓取线程空等。
+    单个主机同时进行的请求不超过 per_host_limit，达到上限的主机暂时移出堆，
+    done(url) 后再放回。尚未读取抓取间隔的主机只放行一个请求，
+    该请求读取 robots.txt 后，后续请求按其 Crawl-delay 派发。
+    """
+
+    def __init__(self, scheduler, per_host_limit=4):
+        self.scheduler = scheduler
+        self.per_host_limit = per_host_limit
+        self._pending = defaultdict(deque)  # host -> URL
+        self._active = defaultdict(int)
+        self._heap = []                     # (可请求时间, 序号, host)
+        self._in_heap = set()
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return sum(len(urls) for urls in self._pending.values())
+
+    def __bool__(self):
+        return bool(self._pending)
+
+    def _push(self, host, now):
+        if host in self._in_heap or not self._pending.get(host):
+            return
+        if self._active[host] >= self.per_host_limit:
+            return
+        if self._active[host] and not self.scheduler.delay_known(host):
+            return
+        self._in_heap.add(host)
+        heapq.heappush(self._heap, (self.scheduler.ready_at(host, now), next(self._seq), host))
+
+    def add(self, url):
+        host = host_key(url)
+        self._pending[host].append(url)
+        self._push(host, time.monotonic())
+
+    def pop(self, now=None):
+        """返回 (url, 0)；暂时没有可请求的主机时返回 (None, 需等待的秒数)，队列为空时返回 (None, None)"""
+        now = time.monotonic() if now is None else now
+        while self._heap:
+            ready, _, host = self._heap[0]
+            if ready > now:
+                return None, ready - now
+            heapq.heappop(self._heap)
+            # 入堆后主机可能被限流，可请求时间以当前状态为准
+            actual = self.scheduler.ready_at(host, now)
+            if actual > now:
+                heapq.heappush(self._heap, (actual, next(self._seq), host))
+                continue
+            self._in_heap.discard(host)
+            url = self._pending[host].popleft()
+            if not self._pending[host]:
+                del self._pending[host]
+            self._active[host] += 1
+            self.scheduler.grant(url, now)
+            self._push(host, now)
+            return url, 0.0
+        return None, None
+
+    def upcoming(self, n):
+        """最早可请求的 n 个主机各自的下一个URL，用于提前预热连接"""
+        return [self._pending[host][0] for _, _, host in heapq.nsmallest(n, self._heap)
+                if self._pending.get(host)]
+
+    def done(self, url):
+        """URL处理完毕；放行后没有发出请求时撤销放行"""
+        self.scheduler.revoke(url)
+        host = host_key(url)
+        self._active[host] -= 1
+        if self._active[host] <= 0:
+            del self._active[host]
+        self._push(host, time.monotonic())
+
+    def clear(self):
+        self._pending.clear()
+        self._heap.clear()
+        self._in_heap.clear()
@@ -0,0 +1,180 @@
+import math
+import time
+import heapq
+import sqlite3
+import hashlib
+import threading
+
+HOUR = 3600.0
+DAY = 86400.0
+
+
+def content_hash(text):
+    """正文哈希，用于判断两次访问之间页面是否变化"""
+    return hashlib.blake2b((text or "").encode("utf-8"), digest_size=16).hexdigest()
+
+
+def estimate_change_rate(visits, changes, observed):
+    """按泊松过程估计变化频率（次/秒）
+
+    visits 为已观察的访问间隔数，changes 为其中检测到变化的次数，observed 为这些间隔的总时长。
+    每个间隔内最多只能检测到一次变化，直接用 changes / observed 会低估频繁变化的页面，
+    这里使用 Cho & Garcia-Molina 的修正估计 -ln((n - X + 0.5) / (n + 0.5)) / I。
+    """
+    if visits <= 0 or observed <= 0:
+        return 0.0
+    mean_interval = observed / visits
+    return max(0.0, -math.log((visits - changes + 0.5) / (visits + 0.5)) / mean_interval)
+
+
+class RecrawlScheduler:
+    """按URL估计页面变化频率并安排重新抓取
+
+    每次访问记录 full_content 的哈希，与上次比较得到是否变化。
+    有变化记录的页面按泊松模型安排下次访问：在间隔内发生变化的概率达到 target_change_prob 时重访；
+    从未变化的页面按 backoff 倍数逐次拉长间隔。间隔限制在 [min_interval, max_interval]。
+    due() 按每小时抓取预算返回到期的URL，优先返回当前最可能已经变化的页面。
+    """
+
+    def __init__(self, path, budget_per_hour=600, min_interval=HOUR, max_interval=30 * DAY,
+                 initial_interval=DAY, target_change_prob=0.5, backoff=2.0):
+        self.path = path
+        self.budget_per_hour = budget_per_hour
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.target_change_prob = target_change_prob
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT,
+                visits INTEGER NOT NULL DEFAULT 0,
+                changes INTEGER NOT NULL DEFAULT 0,
+                observed REAL NOT NULL DEFAULT 0,
+                first_seen REAL NOT NULL,
+                last_visit REAL NOT NULL,
+                last_change REAL,
+                interval REAL NOT NULL,
+                next_visit REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_next ON pages(next_visit)")
+        self.conn.commit()
+
+    def _clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _next_interval(self, visits, changes, observed, last_interval):
+        if changes == 0:
+            return self._clamp(last_interval * self.backoff)
+        rate = estimate_change_rate(visits, changes, observed)
+        if rate <= 0:
+            return self.max_interval
+        return self._clamp(-math.log(1.0 - self.target_change_prob) / rate)
+
+    def observe(self, url, full_content=None, digest=None, now=None):
+        """记录一次访问，返回页面是否变化（首次访问返回 True）
+
+        可直接传入 digest；只知道页面未变化（如 304）时 full_content 和 digest 都传 None。
+        """
+        now = time.time() if now is None else now
+        if digest is None and full_content is not None:
+            digest = content_hash(full_content)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content_hash, visits, changes, observed, last_visit, interval FROM pages WHERE url=?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                interval = self._clamp(self.initial_interval)
+                self.conn.execute(
+                    "INSERT INTO pages (url, content_hash, first_seen, last_visit, last_change, interval, next_visit) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, digest, now, now, now, interval, now + interval),
+                )
+                self.conn.commit()
+                return True
+
+            old_hash, visits, changes, observed, last_visit, last_interval = row
+            changed = digest is not None and digest != old_hash
+            visits += 1
+            observed += max(0.0, now - last_visit)
+            if changed:
+                changes += 1
+            interval = self._next_interval(visits, changes, observed, last_interval)
+            self.conn.execute(
+                "UPDATE pages SET content_hash=?, visits=?, changes=?, observed=?, last_visit=?, "
+                "last_change=CASE WHEN ? THEN ? ELSE last_change END, interval=?, next_visit=? WHERE url=?",
+                (digest or old_hash, visits, changes, observed, now, changed, now, interval, now + interval, url),
+            )
+            self.conn.commit()
+            return changed
+
+    def change_rate(self, url):
+        """估计的变化频率（次/天），没有记录时返回 None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT visits, changes, observed FROM pages WHERE url=?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return estimate_change_rate(*row) * DAY
+
+    def fetched_last_hour(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM pages WHERE last_visit > ?", (now - HOUR,)
+            ).fetchone()[0]
+
+    def due(self, limit=None, now=None):
+        """返回到期需要重新抓取的URL列表
+
+        数量不超过本小时剩余的抓取预算（budget_per_hour 减去最近一小时已访问的页面数）和 limit；
+        按自上次访问以来发生变化的概率从高到低排序，从未变化的页面按逾期时长排序。
+        """
+        now = time.time() if now is None else now
+        remaining = self.budget_per_hour - self.fetched_last_hour(now) if self.budget_per_hour else limit
+        if limit is not None:
+            remaining = min(remaining, limit) if remaining is not None else limit
+        if remaining is not None and remaining <= 0:
+            return []
+
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT url, visits, changes, observed, last_visit, next_visit FROM pages WHERE next_visit <= ?",
+                (now,),
+            ).fetchall()
+
+        def score(row):
+            url, visits, changes, observed, last_visit, next_visit = row
+            rate = estimate_change_rate(visits, changes, observed)
+            stale = 1.0 - math.exp(-rate * (now - last_visit))
+            return stale, now - next_visit
+
+        if remaining is None:
+            rows.sort(key=score, reverse=True)
+        else:
+            rows = heapq.nlargest(remaining, rows, key=score)
+        return [row[0] for row in rows]
+
+    def stats(self):
+        with self._lock:
+            total, due = self.conn.execute(
+                "SELECT COUNT(*), SUM(next_visit <= ?) FROM pages", (time.time(),)
+            ).fetchone()
+        return {"tracked": total, "due": due or 0}
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM pages")
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+from bs4.element import Tag, NavigableString, CData
+
+# 常见前端框架挂载点
+ROOT_IDS = {"root", "app", "__next", "__nuxt", "___gatsby", "app-root", "svelte", "q-app"}
+ROOT_TAGS = {"app-root"}
+# 不算可见文本的标签
+INVISIBLE_TAGS = {"script", "style", "noscript", "template", "head"}
+NOSCRIPT_HINTS = ("javascript", "enable js", "启用", "开启", "浏览器不支持")
+
+
+def visible_text_length(soup):
+    """可见文本的字符数（去掉首尾空白，不含 script/style/noscript 等）"""
+    root = soup.body or soup
+    total = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (NavigableString, CData)):
+            if type(node) in (NavigableString, CData):
+                total += len(node.strip())
+        elif isinstance(node, Tag) and node.name not in INVISIBLE_TAGS:
+            stack.extend(node.contents)
+    return total
+
+
+def looks_like_js_shell(soup, markup_size, min_text=500, min_ratio=0.01):
+    """根据静态 HTML 判断页面是否需要执行 JavaScript 才有内容，返回 (bool, 原因)
+
+    - 可见文本不少于 min_text 个字符时认为不需要
+    - 存在空的框架挂载点（如 <div id="root"></div>）
+    - <noscript> 中提示需要启用 JavaScript
+    - 有脚本且文本与标记的比例低于 min_ratio
+    """
+    text_len = visible_text_length(soup)
+    if text_len >= min_text:
+        return False, ""
+
+    root = soup.body or soup
+    for tag in root.find_all(True):
+        if (tag.get("id") in ROOT_IDS or tag.name in ROOT_TAGS) and not tag.get_text(strip=True):
+            return True, f"空的挂载点 <{tag.name} id={tag.get('id')}>"
+
+    for tag in soup.find_all("noscript"):
+        text = tag.get_text(" ", strip=True).lower()
+        if any(hint in text for hint in NOSCRIPT_HINTS):
+            return True, "noscript 提示需要 JavaScript"
+
+    if markup_size and text_len / markup_size < min_ratio and soup.find("script") is not None:
+        return True, f"文本/标记比例 {text_len / markup_size:.3f}"
+    return False, ""
+
+
+class RenderDetector:
+    """按域名缓存"是否需要动态渲染"的结论
+
+    域名没有结论时对每个页面做启发式判断：
+    - 判断需要渲染的页面渲染一次，渲染后的可见文本明显多于静态页面（gain_ratio 倍且多出 min_gain 字符）
+      则记为需要渲染，否则记为不需要；之后该域名不再做判断，也不会再为了判断而渲染
+    - 连续 static_confirmations 个页面判断为不需要渲染时，记为不需要
+    LRU 淘汰，最多保留 max_entries 个域名。
+    """
+
+    def __init__(self, max_entries=4096, static_confirmations=3, gain_ratio=2.0, min_gain=200):
+        self.max_entries = max_entries
+        self.static_confirmations = static_confirmations
+        self.gain_ratio = gain_ratio
+        self.min_gain = min_gain
+        self._verdicts = OrderedDict()  # host -> True / False
+        self._static_seen = {}          # host -> 连续判断为静态的页面数
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(url):
+        return urlparse(url).netloc.lower()
+
+    def _store(self, key, verdict):
+        self._verdicts[key] = verdict
+        self._verdicts.move_to_end(key)
+        self._static_seen.pop(key, None)
+        while len(self._verdicts) > self.max_entries:
+            self._verdicts.popitem(last=False)
+
+    def verdict(self, url):
+        """域名的结论：True 需要渲染，False 不需要，None 尚未确定"""
+        key = self.cache_key(url)
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+            return verdict
+
+    def should_render(self, url, soup, markup_size):
+        """该页面是否应当交给浏览器渲染"""
+        verdict = self.verdict(url)
+        if verdict is not None:
+            return verdict
+        shell, _ = looks_like_js_shell(soup, markup_size)
+        if not shell:
+            key = self.cache_key(url)
+            with self._lock:
+                seen = self._static_seen.get(key, 0) + 1
+                if seen >= self.static_confirmations:
+                    self._store(key, False)
+                else:
+                    self._static_seen[key] = seen
+        return shell
+
+    def record_render(self, url, static_chars, rendered_chars):
+        """比较静态与渲染后的可见文本长度，记录该域名的结论并返回"""
+        verdict = rendered_chars >= max(static_chars * self.gain_ratio, static_chars + self.min_gain)
+        with self._lock:
+            self._store(self.cache_key(url), verdict)
+        return verdict
+
+    def clear(self):
+        with self._lock:
+            self._verdicts.clear()
+            self._static_seen.clear()
@@ -0,0 +1,193 @@
+import time
+import random
+import socket
+import threading
+from urllib.parse import urlparse
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout, ChunkedEncodingError, HTTPError
+
+DNS = "dns"
+CONNECT = "connect"
+READ_TIMEOUT = "read_timeout"
+SERVER_ERROR = "server_error"
+
+
+class CircuitOpen(Exception):
+    """主机连续失败，熔断期间不再发出请求"""
+
+
+class RetryPolicy:
+    """一类错误的重试策略：最多尝试 max_attempts 次，等待时间为带完全抖动的指数退避"""
+
+    __slots__ = ("max_attempts", "base_delay", "max_delay")
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=10.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """第 attempt 次（从 0 开始）失败后的等待秒数"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+# DNS 失败通常不是瞬时的，只再试一次；读超时说明服务器慢，重试次数少、间隔长
+DEFAULT_POLICIES = {
+    DNS: RetryPolicy(max_attempts=2, base_delay=2.0, max_delay=5.0),
+    CONNECT: RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=8.0),
+    READ_TIMEOUT: RetryPolicy(max_attempts=2, base_delay=1.0, max_delay=10.0),
+    SERVER_ERROR: RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=15.0),
+}
+
+
+def _is_dns_error(exc):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, socket.gaierror) or type(exc).__name__ == "NameResolutionError":
+            return True
+        for arg in getattr(exc, "args", ()):
+            if isinstance(arg, BaseException):
+                if _is_dns_error(arg):
+                    return True
+            elif isinstance(arg, str) and ("Name or service not known" in arg
+                                           or "getaddrinfo failed" in arg
+                                           or "nodename nor servname" in arg
+                                           or "Temporary failure in name resolution" in arg):
+                return True
+        exc = getattr(exc, "reason", None) or exc.__cause__ or exc.__context__
+    return False
+
+
+def classify_error(exc):
+    """把请求异常归类为 dns / connect / read_timeout / server_error，不可重试的返回 None"""
+    if isinstance(exc, HTTPError):
+        response = exc.response
+        if response is not None and response.status_code >= 500:
+            return SERVER_ERROR
+        return None
+    if isinstance(exc, ConnectTimeout):
+        return CONNECT
+    if isinstance(exc, (ReadTimeout, ChunkedEncodingError)):
+        return READ_TIMEOUT
+    if isinstance(exc, ConnectionError):
+        return DNS if _is_dns_error(exc) else CONNECT
+    return None
+
+
+class _Circuit:
+    __slots__ = ("failures", "opened_until", "cooldown", "trial")
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_until = 0.0
+        self.cooldown = 0.0
+        self.trial = False
+
+
+class CircuitBreaker:
+    """按主机熔断
+
+    连续 failure_threshold 次请求失败（重试用尽）后熔断 cooldown 秒；
+    到期后放行一个试探请求，成功则恢复，失败则熔断时间翻倍（最长 max_cooldown 秒），
+    长期不可用的主机在整个抓取过程中基本不再占用抓取线程。
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=60.0, max_cooldown=3600.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host):
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or circuit.failures < self.failure_threshold:
+                return True
+            if now < circuit.opened_until or circuit.trial:
+                return False
+            circuit.trial = True
+            return True
+
+    def record_success(self, host):
+        with self._lock:
+            self._circuits.pop(host, None)
+
+    def record_failure(self, host):
+        """记录一次失败，返回熔断是否因此打开"""
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuits.setdefault(host, _Circuit())
+            circuit.failures += 1
+            if circuit.failures < self.failure_threshold:
+                return False
+            if not circuit.trial and now < circuit.opened_until:
+                # 熔断前已发出的请求陆续失败，不重复延长
+                return False
+            if circuit.trial or circuit.cooldown:
+                circuit.cooldown = min(self.max_cooldown, max(circuit.cooldown, self.base_cooldown) * 2)
+            else:
+                circuit.cooldown = self.base_cooldown
+            circuit.trial = False
+            circuit.opened_until = now + circuit.cooldown
+            return True
+
+    def release_trial(self, host):
+        """试探请求没有得到结果（如被限流而未发出）时，允许下一个请求继续试探"""
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is not None:
+                circuit.trial = False
+
+    def is_open(self, host):
+        with self._lock:
+            circuit = self._circuits.get(host)
+            return bool(circuit and circuit.failures >= self.failure_threshold
+                        and time.monotonic() < circuit.opened_until)
+
+
+class Retrier:
+    """按错误类别重试请求，并维护各主机的熔断状态
+
+    neutral 中的异常表示请求没有真正发出（如本地限流），既不重试也不计入熔断。
+    其他未归类的异常（4xx、内容类型不符等）说明主机有响应，按成功处理后原样抛出。
+    """
+
+    def __init__(self, policies=None, breaker=None, neutral=(), logger=None):
+        self.policies = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+        self.breaker = breaker or CircuitBreaker()
+        self.neutral = tuple(neutral)
+        self.logger = logger
+
+    def call(self, url, fn):
+        host = urlparse(url).netloc.lower()
+        if not self.breaker.allow(host):
+            raise CircuitOpen(f"{host} 连续失败，已暂停请求")
+        attempt = 0
+        while True:
+            try:
+                result = fn()
+            except self.neutral:
+                self.breaker.release_trial(host)
+                raise
+            except Exception as e:
+                kind = classify_error(e)
+                if kind is None:
+                    self.breaker.record_success(host)
+                    raise
+                policy = self.policies.get(kind)
+                if policy is None or attempt + 1 >= policy.max_attempts:
+                    if self.breaker.record_failure(host) and self.logger:
+                        self.logger.warning(f"{host} 连续失败，熔断")
+                    raise
+                delay = policy.delay(attempt)
+                if self.logger:
+                    self.logger.info(f"{kind} 错误，{delay:.1f} 秒后重试 ({attempt + 1}/{policy.max_attempts - 1}): {url}")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success(host)
+            return result
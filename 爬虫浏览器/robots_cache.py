@@ -0,0 +1,125 @@
+import time
+import threading
+import logging
+import urllib.robotparser
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class RobotsCache:
+    """按 scheme+host 缓存 robots.txt 解析结果
+
+    - LRU 淘汰，最多保留 max_entries 个站点
+    - 正常结果缓存 ttl 秒
+    - 404 等"无 robots.txt"的结果同样按 ttl 缓存（全部允许）
+    - 超时、连接失败、5xx 按 negative_ttl 缓存（宽松策略，全部允许），避免反复重试
+    """
+
+    def __init__(self, http, max_entries=1024, ttl=24 * 3600, negative_ttl=600, timeout=5):
+        self.http = http
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self._entries = OrderedDict()  # key -> (parser, expires_at)
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+
+    @staticmethod
+    def cache_key(url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}"
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            parser, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return parser
+
+    def _store(self, key, parser, ttl):
+        with self._lock:
+            self._entries[key] = (parser, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _download(self, key):
+        robots_url = f"{key}/robots.txt"
+        parser = urllib.robotparser.RobotFileParser()
+        parser.set_url(robots_url)
+        try:
+            response = self.http.get(robots_url, timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"无法获取 robots.txt ({robots_url}): {e}")
+            parser.allow_all = True
+            return parser, self.negative_ttl
+
+        # 与 RobotFileParser.read 的判定保持一致
+        if response.status_code in (401, 403):
+            parser.disallow_all = True
+            return parser, self.ttl
+        if 400 <= response.status_code < 500:
+            parser.allow_all = True
+            return parser, self.ttl
+        if response.status_code >= 500:
+            parser.allow_all = True
+            return parser, self.negative_ttl
+        parser.parse(response.text.splitlines())
+        return parser, self.ttl
+
+    def get_parser(self, url):
+        key = self.cache_key(url)
+        parser = self._lookup(key)
+        if parser is not None:
+            return parser
+
+        # 同一站点只允许一个线程去下载，其余线程等待结果
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:
+            parser = self._lookup(key)
+            if parser is None:
+                parser, ttl = self._download(key)
+                self._store(key, parser, ttl)
+        with self._lock:
+            self._fetch_locks.pop(key, None)
+        return parser
+
+    def can_fetch(self, url, user_agent="*"):
+        return self.get_parser(url).can_fetch(user_agent, url)
+
+    def crawl_delay(self, url, user_agent="*"):
+        """返回 Crawl-delay（秒），未声明时返回 None"""
+        delay = self.get_parser(url).crawl_delay(user_agent)
+        return float(delay) if delay is not None else None
+
+    def request_rate(self, url, user_agent="*"):
+        """返回 Request-rate（RequestRate(requests, seconds)），未声明时返回 None"""
+        return self.get_parser(url).request_rate(user_agent)
+
+    def min_interval(self, url, user_agent="*"):
+        """综合 Crawl-delay 与 Request-rate 得出两次请求的最小间隔（秒）"""
+        parser = self.get_parser(url)
+        interval = 0.0
+        delay = parser.crawl_delay(user_agent)
+        if delay is not None:
+            interval = max(interval, float(delay))
+        rate = parser.request_rate(user_agent)
+        if rate is not None and rate.requests:
+            interval = max(interval, rate.seconds / rate.requests)
+        return interval
+
+    def invalidate(self, url=None):
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self.cache_key(url), None)
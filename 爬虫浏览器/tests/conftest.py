@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 模块以平铺方式互相导入（from utils import ...），测试时把源码目录加入搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
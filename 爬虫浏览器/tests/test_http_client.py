@@ -0,0 +1,47 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_client import CrawlerHttpClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = b"<html><title>t</title><body>ok</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+
+def test_prewarmed_connection_is_used_by_fetch():
+    server = _CountingServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    http = CrawlerHttpClient()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/page"
+        assert http.prewarm(url) is True
+        response, body = http.fetch_html(url)
+        assert response.status_code == 200 and b"ok" in body
+        assert server.connections == 1
+    finally:
+        http.close()
+        server.shutdown()
+        server.server_close()
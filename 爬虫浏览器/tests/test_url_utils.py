@@ -0,0 +1,24 @@
+from url_utils import canonicalize_url
+
+
+def test_cjk_path_and_query_are_utf8_encoded():
+    assert canonicalize_url("http://a.com/搜索?q=中文") == "http://a.com/%E6%90%9C%E7%B4%A2?q=%E4%B8%AD%E6%96%87"
+
+
+def test_cjk_raw_and_encoded_forms_match():
+    raw = canonicalize_url("http://a.com/搜索/页面?q=中文&page=2")
+    encoded = canonicalize_url("http://a.com/%e6%90%9c%e7%b4%a2/%E9%A1%B5%E9%9D%A2?page=2&q=%E4%B8%AD%E6%96%87")
+    assert raw == encoded
+
+
+def test_existing_escapes_keep_their_bytes():
+    # 非 UTF-8 的 %FF 不被改写
+    assert canonicalize_url("http://a.com/s?q=中文&a=%FF") == "http://a.com/s?a=%FF&q=%E4%B8%AD%E6%96%87"
+
+
+def test_tracking_params_and_fragment_removed():
+    assert canonicalize_url("HTTP://A.com:80/x?utm_source=a&b=1#top") == "http://a.com/x?b=1"
+
+
+def test_ipv6_host_keeps_brackets():
+    assert canonicalize_url("http://[::1]:8080/a") == "http://[::1]:8080/a"
@@ -0,0 +1,219 @@
+import os
+import re
+import math
+import mmap
+import struct
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote
+
+# 不影响页面内容的跟踪参数
+TRACKING_PARAMS = {
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "spm", "scm", "share_source", "share_medium", "share_plat",
+    "share_session_id", "share_tag", "vd_source", "wfr",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hmsr", "hmpl", "hmcu", "hmkw", "hmci")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_PERCENT_ESCAPE = re.compile(r"%[0-9a-fA-F]{2}")
+_NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+
+
+def _quote_non_ascii(text):
+    """把未编码的非 ASCII 字符按 UTF-8 百分号编码，已有的 %XX 保持不变"""
+    return _NON_ASCII.sub(lambda m: quote(m.group(0), safe=""), text)
+
+
+def canonicalize_url(url):
+    """URL 规范化，用于判重
+
+    - scheme 和 host 转小写，去掉默认端口与末尾的点
+    - 去掉 #锚点
+    - 去掉跟踪参数，其余查询参数按键值排序
+    - 空路径补为 "/"，路径中的百分号编码统一为大写
+    - 路径和查询中未编码的中文等非 ASCII 字符按 UTF-8 百分号编码，与浏览器发出的请求一致
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    # IPv6 地址需要保留方括号
+    netloc = f"[{host}]" if ":" in host else host
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{netloc}:{port}"
+
+    path = _PERCENT_ESCAPE.sub(lambda m: m.group(0).upper(), _quote_non_ascii(parts.path)) or "/"
+
+    # 以 latin-1 往返编解码，保证原始字节（包括非法 UTF-8）不被改写
+    query = [
+        (k, v) for k, v in parse_qsl(_quote_non_ascii(parts.query), keep_blank_values=True, encoding="latin-1")
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+    return urlunsplit((scheme, netloc, path, urlencode(query, encoding="latin-1"), ""))
+
+
+def _hash_pair(item):
+    digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+    h1, h2 = struct.unpack("<QQ", digest)
+    return h1, h2 | 1
+
+
+class BloomFilter:
+    """固定容量的布隆过滤器
+
+    capacity 个元素时误判率约为 error_rate，每个元素约占 -ln(p)/ln(2)^2 位。
+    指定 path 时位数组保存在内存映射文件中，可跨进程重启复用。
+    """
+
+    _MAGIC = b"BLM1"
+    _HEADER = struct.Struct("<4sQQQd")  # magic, num_bits, num_hashes, count, error_rate
+
+    def __init__(self, capacity, error_rate=0.001, path=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        nbytes = (self.num_bits + 7) // 8
+        if path:
+            self._open_mmap(path, nbytes)
+        else:
+            self._offset = 0
+            self.count = 0
+            self._bits = bytearray(nbytes)
+
+    def _open_mmap(self, path, nbytes):
+        size = self._HEADER.size + nbytes
+        exists = os.path.exists(path) and os.path.getsize(path) == size
+        self._file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.truncate(size)
+        self._bits = mmap.mmap(self._file.fileno(), size)
+        self._offset = self._HEADER.size
+        if exists:
+            magic, num_bits, num_hashes, count, _ = self._HEADER.unpack_from(self._bits, 0)
+            if magic != self._MAGIC or num_bits != self.num_bits or num_hashes != self.num_hashes:
+                raise ValueError(f"布隆过滤器文件与参数不匹配: {path}")
+            self.count = count
+        else:
+            self.count = 0
+            self._write_header()
+
+    def _write_header(self):
+        self._HEADER.pack_into(
+            self._bits, 0, self._MAGIC, self.num_bits, self.num_hashes, self.count, self.error_rate
+        )
+
+    def _positions(self, item):
+        h1, h2 = _hash_pair(item)
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def __contains__(self, item):
+        bits, offset = self._bits, self._offset
+        return all(bits[offset + (p >> 3)] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item):
+        """加入元素，若元素（可能）已存在返回 False"""
+        positions = self._positions(item)
+        with self._lock:
+            bits, offset = self._bits, self._offset
+            added = False
+            for p in positions:
+                idx = offset + (p >> 3)
+                mask = 1 << (p & 7)
+                if not bits[idx] & mask:
+                    bits[idx] |= mask
+                    added = True
+            if added:
+                self.count += 1
+                if self._file:
+                    self._write_header()
+            return added
+
+    def is_full(self):
+        return self.count >= self.capacity
+
+    def flush(self):
+        if self._file:
+            self._bits.flush()
+
+    def close(self):
+        if self._file:
+            self._bits.flush()
+            self._bits.close()
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return self.count
+
+
+class ScalableBloomFilter:
+    """可扩容的布隆过滤器（Almeida 等人的方案）
+
+    当前分片写满后新建一个容量翻倍、误判率减半的分片，
+    总误判率收敛于 error_rate，无需预先知道URL总量。
+    指定 path 时各分片保存为 path.0、path.1 …，重新打开时自动加载。
+    """
+
+    def __init__(self, initial_capacity=1_000_000, error_rate=0.001, path=None,
+                 growth=2, tightening=0.5):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.path = path
+        self.growth = growth
+        self.tightening = tightening
+        self._lock = threading.Lock()
+        self.filters = []
+        if path:
+            while os.path.exists(self._slice_path(len(self.filters))):
+                self.filters.append(self._new_slice(len(self.filters)))
+        if not self.filters:
+            self.filters.append(self._new_slice(0))
+
+    def _slice_path(self, index):
+        return f"{self.path}.{index}" if self.path else None
+
+    def _new_slice(self, index):
+        capacity = self.initial_capacity * (self.growth ** index)
+        error = self.error_rate * (1 - self.tightening) * (self.tightening ** index)
+        return BloomFilter(capacity, error, path=self._slice_path(index))
+
+    def __contains__(self, item):
+        return any(item in f for f in reversed(self.filters))
+
+    def add(self, item):
+        """加入元素，若元素（可能）已存在返回 False"""
+        with self._lock:
+            if item in self:
+                return False
+            current = self.filters[-1]
+            if current.is_full():
+                current.flush()
+                current = self._new_slice(len(self.filters))
+                self.filters.append(current)
+            return current.add(item)
+
+    def flush(self):
+        for f in self.filters:
+            f.flush()
+
+    def close(self):
+        for f in self.filters:
+            f.close()
+
+    def __len__(self):
+        return sum(len(f) for f in self.filters)
+
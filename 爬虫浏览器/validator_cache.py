@@ -0,0 +1,85 @@
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+
+class ValidatorCache:
+    """按 URL 持久化 HTTP 验证信息（ETag / Last-Modified / 正文哈希）
+
+    重新抓取时据此发送 If-None-Match / If-Modified-Since；
+    同时保存页面的出链，页面未变化时站点抓取仍可沿原有链接继续。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                links BLOB,
+                fetched_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        """返回 {"etag", "last_modified", "content_hash", "fetched_at"}，没有记录时返回 None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, content_hash, fetched_at FROM validators WHERE url=?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "content_hash": row[2], "fetched_at": row[3]}
+
+    def conditional_headers(self, url):
+        """生成条件请求头"""
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers, entry
+
+    def links(self, url):
+        """上次抓取时保存的出链"""
+        with self._lock:
+            row = self.conn.execute("SELECT links FROM validators WHERE url=?", (url,)).fetchone()
+        if not row or not row[0]:
+            return []
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, url, etag=None, last_modified=None, content_hash=None, links=None):
+        blob = zlib.compress(json.dumps(links, ensure_ascii=False).encode("utf-8")) if links else None
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO validators (url, etag, last_modified, content_hash, links, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, blob, time.time()),
+            )
+            self.conn.commit()
+
+    def touch(self, url):
+        """页面未变化时只更新抓取时间"""
+        with self._lock:
+            self.conn.execute("UPDATE validators SET fetched_at=? WHERE url=?", (time.time(), url))
+            self.conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM validators")
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()